@@ -0,0 +1,212 @@
+"""
+Columnar analytics for FlipTrack
+
+Loads the numeric item columns into NumPy arrays once and computes the
+breakdowns the analytics views need with vectorized group-bys. Loaded
+data is cached per database file and reused until Database.data_version()
+changes. Archived items are left out unless include_archive=True asks for
+lifetime figures.
+"""
+
+import threading
+from datetime import date
+from functools import cached_property
+from typing import Dict, List
+
+import numpy as np
+
+from database import Database
+
+STATUS_CODES = {'Draft': 0, 'Listed': 1, 'Sold': 2}
+SOLD = STATUS_CODES['Sold']
+
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# Default margin histogram edges, in percent of the sale price
+MARGIN_BINS = (-100, -50, -25, 0, 10, 20, 30, 40, 50, 75, 100)
+
+_COLUMNS_SQL = """
+    SELECT
+        id,
+        CASE status WHEN 'Draft' THEN 0 WHEN 'Listed' THEN 1 WHEN 'Sold' THEN 2 ELSE -1 END,
+        total_expenses,
+        COALESCE(final_sold_price, 0),
+        final_sold_price IS NOT NULL,
+        julianday(date_sold),
+        julianday(date_listed),
+        COALESCE(sales_channel, ''),
+        COALESCE(category, ''),
+        COALESCE(provider_id, 0)
+    FROM {table}
+"""
+
+
+def _encode(labels: List[str]):
+    """Dictionary-encode strings: (labels in first-seen order, int codes per row)"""
+    index = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels),
+                        dtype=np.int32, count=len(labels))
+    return list(index), codes
+
+
+def _year_and_quarter(julian_days: np.ndarray):
+    """Calendar year and quarter arrays for Julian days (0 where NaN)"""
+    known = ~np.isnan(julian_days)
+    days = np.floor(julian_days[known] - UNIX_EPOCH_JULIAN_DAY).astype('datetime64[D]')
+    years = np.zeros(julian_days.shape, dtype=np.int32)
+    quarters = np.zeros(julian_days.shape, dtype=np.int8)
+    years[known] = days.astype('datetime64[Y]').astype(np.int32) + 1970
+    quarters[known] = days.astype('datetime64[M]').astype(np.int32) % 12 // 3 + 1
+    return years, quarters
+
+
+class ItemColumns:
+    """Item numbers as parallel arrays, one element per item"""
+    
+    def __init__(self, rows: List[tuple]):
+        columns = list(zip(*rows)) if rows else [()] * 10
+        self.count = len(rows)
+        self.ids = np.array(columns[0], dtype=np.int64)
+        self.status = np.array(columns[1], dtype=np.int8)
+        self.expenses = np.array(columns[2], dtype=np.float64)
+        self.sold_price = np.array(columns[3], dtype=np.float64)
+        has_price = np.array(columns[4], dtype=bool)
+        # Julian days, NaN where the date is missing
+        sold_day = np.array(columns[5], dtype=np.float64)
+        listed_day = np.array(columns[6], dtype=np.float64)
+        self.days_to_sell = sold_day - listed_day
+        self.sold_year, self.sold_quarter = _year_and_quarter(sold_day)
+        self.channels, self.channel_codes = _encode(columns[7])
+        self.categories, self.category_codes = _encode(columns[8])
+        provider_ids, provider_codes = np.unique(np.array(columns[9], dtype=np.int64),
+                                                 return_inverse=True)
+        self.provider_ids = provider_ids.tolist()
+        self.provider_codes = provider_codes.astype(np.int32)
+        
+        self.sold = self.status == SOLD
+        # Profit only exists for sold items with a price, like items.actual_profit
+        self.actual_profit = np.where(self.sold & has_price, self.sold_price - self.expenses, 0.0)
+
+
+class Analytics:
+    """Breakdowns over one snapshot of the items table"""
+    
+    def __init__(self, columns: ItemColumns, data_version: int):
+        self.columns = columns
+        self.data_version = data_version
+    
+    def _group(self, codes: np.ndarray, labels: list, mask: np.ndarray = None) -> List[Dict]:
+        """Per-group counts and sums, largest actual profit first"""
+        c = self.columns
+        if mask is None:
+            mask = slice(None)
+        codes = codes[mask]
+        size = len(labels)
+        sold = c.sold[mask]
+        
+        items = np.bincount(codes, minlength=size)
+        sold_count = np.bincount(codes, weights=sold, minlength=size)
+        revenue = np.bincount(codes, weights=np.where(sold, c.sold_price[mask], 0.0), minlength=size)
+        invested = np.bincount(codes, weights=c.expenses[mask], minlength=size)
+        profit = np.bincount(codes, weights=c.actual_profit[mask], minlength=size)
+        
+        groups = []
+        for index in np.flatnonzero(items):
+            groups.append({
+                'key': labels[index],
+                'items': int(items[index]),
+                'sold': int(sold_count[index]),
+                'revenue': float(revenue[index]),
+                'invested': float(invested[index]),
+                'profit': float(profit[index]),
+                'sell_through': float(sold_count[index] / items[index] * 100),
+            })
+        groups.sort(key=lambda group: (-group['profit'], str(group['key'])))
+        return groups
+    
+    @cached_property
+    def summary(self) -> Dict:
+        """Overall totals, ROI, sell-through and average days to sell"""
+        c = self.columns
+        sold_count = int(c.sold.sum())
+        invested = float(c.expenses.sum())
+        revenue = float(c.sold_price[c.sold].sum())
+        days = c.days_to_sell[c.sold & (c.days_to_sell >= 0)]  # NaN compares False
+        return {
+            'total_items': c.count,
+            'sold_count': sold_count,
+            'total_invested': invested,
+            'total_revenue': revenue,
+            'total_actual_profit': float(c.actual_profit.sum()),
+            'roi': (revenue - invested) / invested * 100 if invested > 0 else 0,
+            'sell_through': sold_count / c.count * 100 if c.count else 0,
+            'avg_days_to_sell': float(days.mean()) if days.size else None,
+        }
+    
+    @cached_property
+    def channels(self) -> List[Dict]:
+        """Sold items grouped by sales channel (items without a channel excluded)"""
+        c = self.columns
+        return [group for group in self._group(c.channel_codes, c.channels, c.sold) if group['key']]
+    
+    @cached_property
+    def categories(self) -> List[Dict]:
+        """All items grouped by category, with sell-through per category"""
+        c = self.columns
+        return self._group(c.category_codes, c.categories)
+    
+    @cached_property
+    def providers(self) -> List[Dict]:
+        """All items grouped by provider id (0 for items without a provider)"""
+        c = self.columns
+        return self._group(c.provider_codes, c.provider_ids)
+    
+    def quarterly_profit(self, year: int = None) -> Dict[int, Dict]:
+        """{quarter: {'count', 'profit'}} for items sold in the given year"""
+        c = self.columns
+        year = year or date.today().year
+        mask = c.sold & (c.sold_year == year)
+        quarters = c.sold_quarter[mask]
+        counts = np.bincount(quarters, minlength=5)
+        profits = np.bincount(quarters, weights=c.actual_profit[mask], minlength=5)
+        return {q: {'count': int(counts[q]), 'profit': float(profits[q])} for q in range(1, 5)}
+    
+    def margin_distribution(self, bins=MARGIN_BINS) -> List[Dict]:
+        """Histogram of profit margin (% of sale price) over sold items"""
+        c = self.columns
+        mask = c.sold & (c.sold_price > 0)
+        margins = c.actual_profit[mask] / c.sold_price[mask] * 100
+        counts, edges = np.histogram(np.clip(margins, bins[0], bins[-1]), bins=bins)
+        return [
+            {'low': float(edges[i]), 'high': float(edges[i + 1]), 'count': int(counts[i])}
+            for i in range(len(counts))
+        ]
+
+
+_cache: Dict[tuple, Analytics] = {}
+_cache_lock = threading.Lock()
+
+
+def get_analytics(db: Database = None, include_archive: bool = False) -> Analytics:
+    """Analytics for the current database contents, reloading only after writes"""
+    db = db or Database()
+    key = (db.db_path, include_archive)
+    version = db.data_version()
+    cached = _cache.get(key)
+    if cached is not None and cached.data_version == version:
+        return cached
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached.data_version == version:
+            return cached
+        with db.pool.reader() as conn:
+            # Read the counter inside the snapshot so it matches the rows
+            version = conn.execute("SELECT version FROM change_counter WHERE id = 1").fetchone()[0]
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(_COLUMNS_SQL.format(table='items')).fetchall()
+            if include_archive:
+                rows += cursor.execute(_COLUMNS_SQL.format(table='items_archive')).fetchall()
+        analytics = Analytics(ItemColumns(rows), version)
+        _cache[key] = analytics
+        return analytics
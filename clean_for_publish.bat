@@ -11,6 +11,16 @@ if exist "tracker.db" (
     echo ✓ Removed tracker.db
 )
 
+if exist "tracker.db-wal" (
+    del /F /Q "tracker.db-wal"
+    echo ✓ Removed tracker.db-wal
+)
+
+if exist "tracker.db-shm" (
+    del /F /Q "tracker.db-shm"
+    echo ✓ Removed tracker.db-shm
+)
+
 if exist "data" (
     rmdir /S /Q "data"
     echo ✓ Removed data directory
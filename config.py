@@ -17,6 +17,14 @@ DATABASE_PATH = BASE_DIR / "tracker.db"
 
 # Database Settings
 DB_TIMEOUT = 30  # seconds
+DB_POOL_SIZE = 8  # idle connections kept per database file
+DB_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024  # bytes kept in the -wal file after a checkpoint
+
+# Web Server Settings (python serve.py)
+WEB_HOST = "0.0.0.0"
+WEB_PORT = 5000
+WEB_WORKERS = 2  # processes (gunicorn only)
+WEB_THREADS = 4  # request threads per process
 
 # Scraping Settings
 SCRAPE_TIMEOUT = 10  # seconds
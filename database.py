@@ -1,350 +1,1263 @@
+import os
+import re
+import base64
 import sqlite3
 import json
-from typing import List, Dict, Optional
+import itertools
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Sequence
 from contextlib import contextmanager
+from config import DB_JOURNAL_SIZE_LIMIT, DB_POOL_SIZE, DB_TIMEOUT
+import query_profiler
+from models import Item, Provider
+from migrations import (ROLLUP_MEASURES, ROLLUP_SCOPES, get_schema_version, migrate,
+                        rebuild_stats_rollup)
 
-class Database:
-    def __init__(self, db_path: str = "tracker.db"):
+
+def _fts_match_query(text: str) -> Optional[str]:
+    """Translate search box text into an FTS5 MATCH expression
+    
+    Double-quoted text is matched as a phrase and every other word as a
+    prefix, so "air jor" finds "Air Jordan 1". Returns None if the text has
+    no searchable words.
+    """
+    terms = []
+    for phrase, chunk in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append('"' + ' '.join(words) + '"')
+        else:
+            terms.extend(f'"{word}"*' for word in re.findall(r'\w+', chunk))
+    return ' '.join(terms) if terms else None
+
+
+# Columns item listings may be sorted by (profit columns are generated and indexed)
+ITEM_SORT_COLUMNS = (
+    'id', 'item_name', 'status', 'purchase_price', 'target_price',
+    'total_expenses', 'potential_profit', 'actual_profit', 'date_added', 'date_sold'
+)
+
+
+# Columns usable for keyset pagination: never NULL and backed by an index
+KEYSET_SORT_COLUMNS = ('id', 'item_name', 'purchase_price', 'potential_profit')
+MAX_PAGE_SIZE = 500
+
+# Columns patch_item may write (id, date_added and generated columns are excluded)
+PATCHABLE_ITEM_COLUMNS = frozenset({
+    'item_name', 'purchase_price', 'shipping_cost', 'target_price', 'product_url',
+    'status', 'final_sold_price', 'report_path', 'image_urls_cache', 'category',
+    'selected_images', 'provider_id', 'listing_fee', 'processing_fee', 'storage_cost',
+    'other_expenses', 'sales_channel', 'listing_url', 'date_listed', 'date_sold',
+    'notes', 'tags', 'condition', 'storage_location'
+})
+
+
+# Every items column (stored and generated); items_archive has the same ones
+ITEM_COLUMNS = (
+    'id', 'item_name', 'purchase_price', 'shipping_cost', 'target_price', 'product_url',
+    'status', 'final_sold_price', 'report_path', 'category', 'provider_id', 'listing_fee',
+    'processing_fee', 'storage_cost', 'other_expenses', 'sales_channel', 'listing_url',
+    'date_added', 'date_listed', 'date_sold', 'notes', 'tags', 'condition',
+    'storage_location', 'total_expenses', 'potential_profit', 'actual_profit', 'version',
+    'updated_at',
+)
+_GENERATED_ITEM_COLUMNS = ('total_expenses', 'potential_profit', 'actual_profit')
+
+# Columns selected for item listings; detail views use get_item for the rest
+ITEM_LIST_COLUMNS = (
+    'id', 'item_name', 'category', 'status', 'purchase_price', 'shipping_cost',
+    'target_price', 'final_sold_price', 'total_expenses', 'potential_profit',
+    'actual_profit', 'provider_id', 'sales_channel', 'report_path', 'date_added',
+    'date_listed', 'date_sold', 'version', 'updated_at',
+)
+
+
+def _item_select_list(columns: Optional[Sequence[str]]) -> str:
+    """SELECT list for the given item columns (all columns when None)"""
+    if columns is None:
+        return "items.*"
+    unknown = [column for column in columns if not re.fullmatch(r'[a-z_]+', column)]
+    if unknown:
+        raise ValueError(f"Invalid item columns: {', '.join(unknown)}")
+    return ", ".join(f"items.{column}" for column in columns)
+
+
+# Item image list keys and their role in item_images
+IMAGE_ROLES = {'selected_images': 'selected', 'image_urls_cache': 'source'}
+
+
+def _image_metadata(path: str) -> tuple:
+    """(size_bytes, width, height, content_hash) for a local image file
+    
+    Remote URLs and missing files give all None; dimensions need Pillow.
+    """
+    if not path or not os.path.isfile(path):
+        return (None, None, None, None)
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    width = height = None
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            width, height = img.size
+    except Exception:
+        pass
+    return (os.path.getsize(path), width, height, digest.hexdigest())
+
+
+def _image_rows(item_data: Dict) -> Dict[str, List[tuple]]:
+    """{role: [(ordinal, path, *metadata)]} for each image list present in item_data
+    
+    Reads every file, so call it before opening a write transaction
+    rather than holding the database lock during file I/O.
+    """
+    return {
+        role: [(ordinal, path, *_image_metadata(path))
+               for ordinal, path in enumerate(item_data[key] or [])]
+        for key, role in IMAGE_ROLES.items() if key in item_data
+    }
+
+
+# Tag join tables and the column holding the owner's id
+_TAG_TABLES = {'item_tags': 'item_id', 'provider_tags': 'provider_id'}
+
+
+def parse_tags(text: Optional[str]) -> List[str]:
+    """Split a comma-separated tags field into normalized, unique tags"""
+    tags = []
+    for tag in (text or '').split(','):
+        tag = tag.strip().lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _tag_filter_sql(tag_table: str, id_column: str, tags: List[str], tag_mode: str):
+    """SQL for '<id_column> IN (...)' matching any or all of the given tags"""
+    if tag_mode not in ('any', 'all'):
+        raise ValueError(f"Unknown tag mode {tag_mode!r}")
+    owner_column = _TAG_TABLES[tag_table]
+    placeholders = ', '.join('?' for _ in tags)
+    sql = f"{id_column} IN (SELECT {owner_column} FROM {tag_table} WHERE tag IN ({placeholders})"
+    if tag_mode == 'all':
+        sql += f" GROUP BY {owner_column} HAVING COUNT(*) = {len(tags)}"
+    return sql + ")", list(tags)
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when patch_item's expected_version no longer matches the row"""
+
+
+def _encode_cursor(item: Dict, sort_by: str, direction: str) -> str:
+    """Encode a page boundary row as an opaque URL-safe cursor"""
+    payload = json.dumps({'value': item[sort_by], 'id': item['id'], 'dir': direction})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> Dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if position['dir'] not in ('next', 'prev'):
+            raise ValueError(position['dir'])
+        return position
+    except Exception:
+        raise ValueError("Invalid page cursor")
+
+
+class ConnectionPool:
+    """Pool of persistent SQLite connections for one database file
+
+    A thread checks a connection out for its outermost transaction() and
+    returns it afterwards, so warm connections (and their page caches) are
+    reused across threads, and short-lived threads such as the development
+    server's one-per-request threads leave nothing open behind them. Up to
+    max_idle returned connections are kept; any more are closed.
+    """
+    
+    def __init__(self, db_path: str, max_idle: int = DB_POOL_SIZE):
         self.db_path = db_path
-        self.init_db()
+        self._local = threading.local()
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self._open = 0
+        self._closed = False
+        # {id(conn): serial}; ids of closed connections can be reused, serials can't
+        self._serials: Dict[int, int] = {}
+        self._next_serial = itertools.count(1)
+    
+    @property
+    def open_connections(self) -> int:
+        """Connections currently open, idle or checked out"""
+        return self._open
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Connections move between threads, but only one thread uses each at a time
+        conn = sqlite3.connect(self.db_path, timeout=DB_TIMEOUT, check_same_thread=False,
+                               factory=query_profiler.connection_factory())
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers in every worker process run alongside one writer;
+        # DB_TIMEOUT (the busy timeout) makes writers queue instead of failing
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Truncate the -wal file after checkpoints so busy periods don't leave it huge
+        conn.execute(f"PRAGMA journal_size_limit={DB_JOURNAL_SIZE_LIMIT}")
+        with self._lock:
+            self._open += 1
+            self._serials[id(conn)] = next(self._next_serial)
+        return conn
+    
+    def _discard(self, conn: sqlite3.Connection):
+        conn.close()
+        with self._lock:
+            self._open -= 1
+            self._serials.pop(id(conn), None)
+    
+    def serial(self, conn: sqlite3.Connection) -> int:
+        """Number identifying a pooled connection for as long as the pool lives"""
+        return self._serials[id(conn)]
+    
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+    
+    def _checkin(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
     
     @contextmanager
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+    def transaction(self):
+        """Yield the thread's connection; only the outermost block commits
+        
+        The outermost block checks a connection out of the pool and
+        returns it when done; nested blocks share it.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._checkout()
+            self._local.depth = 0
+        self._local.depth += 1
+        try:
+            yield conn
+            if self._local.depth == 1:
+                conn.commit()
+        except Exception:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                self._local.conn = None
+                self._checkin(conn)
+    
+    @contextmanager
+    def reader(self):
+        """Yield a separate connection holding one read snapshot
+        
+        For long scans that should not interleave with the thread's own
+        transactions; WAL lets writers carry on while it is open.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=DB_TIMEOUT,
+                               factory=query_profiler.connection_factory())
         conn.row_factory = sqlite3.Row
         try:
+            conn.execute("BEGIN")
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
         finally:
             conn.close()
     
+    def close(self):
+        """Close idle connections; ones checked out close when returned"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
+class Database:
+    _pools: Dict[str, ConnectionPool] = {}
+    _pools_lock = threading.Lock()
+    
+    _migrated_paths = set()
+    _fts_paths = set()
+    # Per-thread {db_path: (marker, version)} for data_version()
+    _version_cache = threading.local()
+    # {(db_path, recent_limit): dashboard data} for get_dashboard_data()
+    _dashboard_cache: Dict[tuple, Dict] = {}
+    _schema_lock = threading.Lock()
+    # Pools inherited over fork(), see _after_fork()
+    _inherited_pools: List[ConnectionPool] = []
+    
+    def __init__(self, db_path: str = "tracker.db"):
+        self.db_path = db_path
+        # Migrations run once per database file per process
+        if db_path not in Database._migrated_paths or not os.path.exists(db_path):
+            self.init_db()
+    
+    @property
+    def pool(self) -> ConnectionPool:
+        pool = Database._pools.get(self.db_path)
+        if pool is None:
+            with Database._pools_lock:
+                pool = Database._pools.setdefault(self.db_path, ConnectionPool(self.db_path))
+        return pool
+    
+    def data_version(self) -> int:
+        """Global change counter, bumped by every item/provider write
+        
+        Safe to key caches on across threads and processes. Re-reading the
+        counter is skipped while PRAGMA data_version (commits by other
+        connections) and this connection's total_changes are unchanged.
+        """
+        with self.pool.transaction() as conn:
+            marker = (self.pool.serial(conn), conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+            cache = getattr(Database._version_cache, 'versions', None)
+            if cache is None:
+                cache = Database._version_cache.versions = {}
+            cached = cache.get(self.db_path)
+            if cached is not None and cached[0] == marker:
+                return cached[1]
+            version = conn.execute("SELECT version FROM change_counter WHERE id = 1").fetchone()[0]
+            cache[self.db_path] = (marker, version)
+            return version
+    
+    @contextmanager
+    def get_connection(self):
+        with self.pool.transaction() as conn, query_profiler.block():
+            yield conn
+    
+    def close(self):
+        """Close pooled connections for this database file"""
+        with Database._pools_lock:
+            pool = Database._pools.pop(self.db_path, None)
+            # A recreated file restarts its change counter, so cached data must go
+            for key in [key for key in Database._dashboard_cache if key[0] == self.db_path]:
+                Database._dashboard_cache.pop(key, None)
+        if pool is not None:
+            pool.close()
+    
+    @classmethod
+    def close_all(cls):
+        """Close pooled connections for every database file"""
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+            cls._dashboard_cache.clear()
+        for pool in pools:
+            pool.close()
+    
+    def backup(self, target_path: str):
+        """Write a consistent copy of the database to target_path
+        
+        Uses SQLite's online backup, so commits still sitting in the -wal
+        file are included and writers in other connections don't block it.
+        """
+        target = sqlite3.connect(target_path)
+        try:
+            with self.pool.reader() as conn:
+                conn.backup(target)
+        finally:
+            target.close()
+    
+    @classmethod
+    def _after_fork(cls):
+        """Give a forked child process its own pools and caches
+        
+        SQLite connections must not be used across fork(), and closing them
+        in the child can disturb the parent's locks, so the inherited ones
+        are only dropped (kept referenced so they are never closed here).
+        """
+        cls._inherited_pools.extend(cls._pools.values())
+        cls._pools = {}
+        cls._pools_lock = threading.Lock()
+        cls._schema_lock = threading.Lock()
+        cls._version_cache = threading.local()
+        cls._dashboard_cache = {}
+    
     def init_db(self):
-        with self.get_connection() as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS items (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    item_name TEXT NOT NULL,
-                    purchase_price REAL NOT NULL,
-                    shipping_cost REAL NOT NULL,
-                    target_price REAL NOT NULL,
-                    product_url TEXT,
-                    status TEXT DEFAULT 'Draft',
-                    final_sold_price REAL,
-                    report_path TEXT,
-                    image_urls_cache TEXT,
-                    category TEXT,
-                    selected_images TEXT,
-                    provider_id INTEGER,
-                    listing_fee REAL DEFAULT 0,
-                    processing_fee REAL DEFAULT 0,
-                    storage_cost REAL DEFAULT 0,
-                    other_expenses REAL DEFAULT 0,
-                    sales_channel TEXT,
-                    listing_url TEXT,
-                    date_added TEXT,
-                    date_listed TEXT,
-                    date_sold TEXT,
-                    notes TEXT,
-                    tags TEXT,
-                    condition TEXT,
-                    storage_location TEXT
-                )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS providers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    contact_person TEXT,
-                    phone TEXT,
-                    email TEXT,
-                    website TEXT,
-                    notes TEXT,
-                    tags TEXT
-                )
-            """)
+        """Bring the database file up to the current schema version"""
+        with Database._schema_lock:
+            if not os.path.exists(self.db_path):
+                # File was removed while connections were still pooled
+                self.close()
+            with self.get_connection() as conn:
+                migrate(conn)
+                has_fts = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'items_fts'"
+                ).fetchone()
+            if has_fts:
+                Database._fts_paths.add(self.db_path)
+            Database._migrated_paths.add(self.db_path)
+    
+    _ITEM_INSERT_SQL = """
+        INSERT INTO items (
+            item_name, purchase_price, shipping_cost, target_price,
+            product_url, status, final_sold_price, category, provider_id,
+            listing_fee, processing_fee, storage_cost, other_expenses,
+            sales_channel, listing_url, date_added, date_listed, date_sold,
+            notes, tags, condition, storage_location, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    def _item_insert_params(self, item_data: Dict, now: str) -> tuple:
+        """Parameters for _ITEM_INSERT_SQL; dates are stamped with now"""
+        return (
+            item_data['item_name'],
+            item_data['purchase_price'],
+            item_data['shipping_cost'],
+            item_data['target_price'],
+            item_data.get('product_url', ''),
+            item_data.get('status', 'Draft'),
+            item_data.get('final_sold_price'),
+            item_data.get('category', ''),
+            item_data.get('provider_id'),
+            item_data.get('listing_fee', 0),
+            item_data.get('processing_fee', 0),
+            item_data.get('storage_cost', 0),
+            item_data.get('other_expenses', 0),
+            item_data.get('sales_channel', ''),
+            item_data.get('listing_url', ''),
+            now,
+            now if item_data.get('status') == 'Listed' else None,
+            now if item_data.get('status') == 'Sold' else None,
+            item_data.get('notes', ''),
+            item_data.get('tags', ''),
+            item_data.get('condition', ''),
+            item_data.get('storage_location', ''),
+            now
+        )
     
     def add_item(self, item_data: Dict) -> int:
         try:
             from datetime import datetime
+            image_rows = _image_rows(item_data)
             with self.get_connection() as conn:
-                date_added = datetime.now().isoformat()
-                date_listed = datetime.now().isoformat() if item_data.get('status') == 'Listed' else None
-                date_sold = datetime.now().isoformat() if item_data.get('status') == 'Sold' else None
-                
-                cursor = conn.execute("""
-                    INSERT INTO items (
-                        item_name, purchase_price, shipping_cost, target_price,
-                        product_url, status, final_sold_price, category,
-                        image_urls_cache, selected_images, provider_id,
-                        listing_fee, processing_fee, storage_cost, other_expenses,
-                        sales_channel, listing_url, date_added, date_listed, date_sold,
-                        notes, tags, condition, storage_location
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    item_data['item_name'],
-                    item_data['purchase_price'],
-                    item_data['shipping_cost'],
-                    item_data['target_price'],
-                    item_data.get('product_url', ''),
-                    item_data.get('status', 'Draft'),
-                    item_data.get('final_sold_price'),
-                    item_data.get('category', ''),
-                    json.dumps(item_data.get('image_urls_cache', [])),
-                    json.dumps(item_data.get('selected_images', [])),
-                    item_data.get('provider_id'),
-                    item_data.get('listing_fee', 0),
-                    item_data.get('processing_fee', 0),
-                    item_data.get('storage_cost', 0),
-                    item_data.get('other_expenses', 0),
-                    item_data.get('sales_channel', ''),
-                    item_data.get('listing_url', ''),
-                    date_added,
-                    date_listed,
-                    date_sold,
-                    item_data.get('notes', ''),
-                    item_data.get('tags', ''),
-                    item_data.get('condition', ''),
-                    item_data.get('storage_location', '')
-                ))
+                cursor = conn.execute(
+                    self._ITEM_INSERT_SQL,
+                    self._item_insert_params(item_data, datetime.now().isoformat())
+                )
+                self._sync_item_children(conn, [cursor.lastrowid], [(item_data, image_rows)])
                 return cursor.lastrowid
         except Exception as e:
             raise Exception(f"Failed to add item: {str(e)}")
     
-    def update_item(self, item_id: int, item_data: Dict):
+    def _sync_tags(self, conn, tag_table: str, owner_id: int, tags_text: Optional[str]):
+        """Replace the normalized tag rows for one item or provider"""
+        owner_column = _TAG_TABLES[tag_table]
+        conn.execute(f"DELETE FROM {tag_table} WHERE {owner_column} = ?", (owner_id,))
+        conn.executemany(
+            f"INSERT INTO {tag_table} ({owner_column}, tag) VALUES (?, ?)",
+            [(owner_id, tag) for tag in parse_tags(tags_text)]
+        )
+    
+    def _sync_images(self, conn, item_id: int, image_rows: Dict[str, List[tuple]]):
+        """Replace an item's image rows for each role in image_rows (see _image_rows)"""
+        for role, rows in image_rows.items():
+            conn.execute("DELETE FROM item_images WHERE item_id = ? AND role = ?", (item_id, role))
+            conn.executemany("""
+                INSERT INTO item_images
+                    (item_id, role, ordinal, path, size_bytes, width, height, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(item_id, role, *row) for row in rows])
+    
+    def _sync_item_children(self, conn, item_ids: Iterable[int], items: Iterable[tuple]):
+        """Write tag and image rows for freshly inserted (item_data, image_rows) pairs"""
+        for item_id, (item_data, image_rows) in zip(item_ids, items):
+            self._sync_tags(conn, 'item_tags', item_id, item_data.get('tags'))
+            self._sync_images(conn, item_id, image_rows)
+    
+    def _sync_provider_children(self, conn, provider_ids: Iterable[int], providers: Iterable[Dict]):
+        """Write tag rows for freshly inserted providers"""
+        for provider_id, provider_data in zip(provider_ids, providers):
+            self._sync_tags(conn, 'provider_tags', provider_id, provider_data.get('tags'))
+    
+    def _insert_batches(self, sql: str, rows: Iterable[Dict], batch_size: int,
+                        to_params, on_batch, on_error=None) -> List[int]:
+        """executemany rows in one transaction per batch
+        
+        to_params maps a row dict to insert parameters; on_batch(conn, ids,
+        rows) writes dependent rows in the same transaction. Returns the
+        new ids. Without on_error a failing batch raises (earlier batches
+        stay committed); with it the batch is rolled back and retried row
+        by row, and each row that still fails is passed to
+        on_error(row, exception) and skipped.
+        """
+        ids = []
+        batch = []
+        
+        def insert(rows):
+            with self.get_connection() as conn:
+                conn.executemany(sql, [to_params(row) for row in rows])
+                # AUTOINCREMENT ids inside one write transaction are consecutive
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                batch_ids = range(last_id - len(rows) + 1, last_id + 1)
+                on_batch(conn, batch_ids, rows)
+            ids.extend(batch_ids)
+        
+        def flush():
+            try:
+                insert(batch)
+            except Exception:
+                if on_error is None:
+                    raise
+                for row in batch:
+                    try:
+                        insert([row])
+                    except Exception as e:
+                        on_error(row, e)
+            batch.clear()
+        
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return ids
+    
+    def add_items_bulk(self, items: Iterable[Dict], batch_size: int = 1000,
+                       on_error: Callable[[Dict, Exception], None] = None) -> List[int]:
+        """Insert many items with batched executemany transactions
+        
+        Args:
+            items: Item dicts in the same shape add_item accepts (may be a generator)
+            batch_size: Rows committed per transaction
+            on_error: If given, called as on_error(item_data, exception) for
+                each item that cannot be inserted, which is then skipped;
+                otherwise the first failure raises
+            
+        Returns:
+            The new item ids, in input order
+        """
+        def prepared():
+            # Image files are read as each batch is gathered, outside its transaction
+            for item_data in items:
+                try:
+                    image_rows = _image_rows(item_data)
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    on_error(item_data, e)
+                    continue
+                yield item_data, image_rows
+        
         try:
             from datetime import datetime
-            with self.get_connection() as conn:
-                # Get current item to check status changes
-                current = self.get_item(item_id)
-                date_listed = item_data.get('date_listed', current.get('date_listed'))
-                date_sold = item_data.get('date_sold', current.get('date_sold'))
-                
-                # Update dates based on status changes
-                if item_data.get('status') == 'Listed' and current.get('status') != 'Listed' and not date_listed:
-                    date_listed = datetime.now().isoformat()
-                if item_data.get('status') == 'Sold' and current.get('status') != 'Sold' and not date_sold:
-                    date_sold = datetime.now().isoformat()
-                
-                conn.execute("""
-                    UPDATE items SET
-                        item_name = ?,
-                        purchase_price = ?,
-                        shipping_cost = ?,
-                        target_price = ?,
-                        product_url = ?,
-                        status = ?,
-                        final_sold_price = ?,
-                        category = ?,
-                        image_urls_cache = ?,
-                        selected_images = ?,
-                        provider_id = ?,
-                        listing_fee = ?,
-                        processing_fee = ?,
-                        storage_cost = ?,
-                        other_expenses = ?,
-                        sales_channel = ?,
-                        listing_url = ?,
-                        date_listed = ?,
-                        date_sold = ?,
-                        notes = ?,
-                        tags = ?,
-                        condition = ?,
-                        storage_location = ?
-                    WHERE id = ?
-                """, (
-                    item_data['item_name'],
-                    item_data['purchase_price'],
-                    item_data['shipping_cost'],
-                    item_data['target_price'],
-                    item_data.get('product_url', ''),
-                    item_data.get('status', 'Draft'),
-                    item_data.get('final_sold_price'),
-                    item_data.get('category', ''),
-                    json.dumps(item_data.get('image_urls_cache', [])),
-                    json.dumps(item_data.get('selected_images', [])),
-                    item_data.get('provider_id'),
-                    item_data.get('listing_fee', 0),
-                    item_data.get('processing_fee', 0),
-                    item_data.get('storage_cost', 0),
-                    item_data.get('other_expenses', 0),
-                    item_data.get('sales_channel', ''),
-                    item_data.get('listing_url', ''),
-                    date_listed,
-                    date_sold,
-                    item_data.get('notes', ''),
-                    item_data.get('tags', ''),
-                    item_data.get('condition', ''),
-                    item_data.get('storage_location', ''),
-                    item_id
-                ))
+            now = datetime.now().isoformat()
+            return self._insert_batches(
+                self._ITEM_INSERT_SQL, prepared(), batch_size,
+                lambda row: self._item_insert_params(row[0], now),
+                self._sync_item_children,
+                None if on_error is None else lambda row, e: on_error(row[0], e)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to add items: {str(e)}")
+    
+    def update_item(self, item_id: int, item_data: Dict):
+        """Replace every editable field of an item
+        
+        Missing optional fields are reset to their defaults, except dates and
+        image lists which are kept; use patch_item to change only some columns.
+        Archived items are read-only, so updating one raises.
+        """
+        try:
+            fields = {
+                'item_name': item_data['item_name'],
+                'purchase_price': item_data['purchase_price'],
+                'shipping_cost': item_data['shipping_cost'],
+                'target_price': item_data['target_price'],
+                'product_url': item_data.get('product_url', ''),
+                'status': item_data.get('status', 'Draft'),
+                'final_sold_price': item_data.get('final_sold_price'),
+                'category': item_data.get('category', ''),
+                'provider_id': item_data.get('provider_id'),
+                'listing_fee': item_data.get('listing_fee', 0),
+                'processing_fee': item_data.get('processing_fee', 0),
+                'storage_cost': item_data.get('storage_cost', 0),
+                'other_expenses': item_data.get('other_expenses', 0),
+                'sales_channel': item_data.get('sales_channel', ''),
+                'listing_url': item_data.get('listing_url', ''),
+                'notes': item_data.get('notes', ''),
+                'tags': item_data.get('tags', ''),
+                'condition': item_data.get('condition', ''),
+                'storage_location': item_data.get('storage_location', '')
+            }
+            # Dates and image lists are only overwritten when the caller supplies them
+            for optional_field in ('date_listed', 'date_sold', *IMAGE_ROLES):
+                if optional_field in item_data:
+                    fields[optional_field] = item_data[optional_field]
+            if not self.patch_item(item_id, **fields):
+                raise ValueError(f"Item {item_id} does not exist or is archived")
         except Exception as e:
             raise Exception(f"Failed to update item: {str(e)}")
     
+    def _patch_assignments(self, fields: Dict) -> tuple:
+        """SET clauses and parameters for patching items with fields
+        
+        Also bumps version and stamps updated_at; image lists are skipped
+        since they live in item_images.
+        """
+        from datetime import datetime
+        now = datetime.now().isoformat()
+        assignments = []
+        params = []
+        
+        for column, value in fields.items():
+            if column in ('date_listed', 'date_sold') and 'status' in fields:
+                continue
+            if column in IMAGE_ROLES:
+                continue
+            assignments.append(f"{column} = ?")
+            params.append(value)
+        
+        if 'status' in fields:
+            # Status and dates are compared against the row's current values
+            for date_column, stamp_status in (('date_listed', 'Listed'), ('date_sold', 'Sold')):
+                if date_column in fields:
+                    base, base_params = "?", [fields[date_column]]
+                else:
+                    base, base_params = date_column, []
+                assignments.append(
+                    f"{date_column} = CASE WHEN ? = ? AND status IS NOT ? AND COALESCE({base}, '') = '' "
+                    f"THEN ? ELSE {base} END"
+                )
+                params.extend([fields['status'], stamp_status, stamp_status, *base_params, now, *base_params])
+        
+        assignments.append("version = version + 1")
+        assignments.append("updated_at = ?")
+        params.append(now)
+        return assignments, params
+    
+    def patch_item(self, item_id: int, expected_version: int = None, **fields) -> bool:
+        """Update only the given columns of an item in a single statement
+        
+        Changing status to Listed/Sold stamps date_listed/date_sold in SQL
+        when the item was not already in that status and has no date yet.
+        Every patch bumps the item's version.
+        
+        Args:
+            item_id: Item to update
+            expected_version: If given, only update when the stored version
+                still matches, raising ConcurrentUpdateError otherwise
+            **fields: Column values, e.g. status='Sold', final_sold_price=90.0
+            
+        Returns:
+            True if the item was updated, False if it does not exist
+        """
+        unknown = set(fields) - PATCHABLE_ITEM_COLUMNS
+        if unknown:
+            raise ValueError(f"Cannot patch item columns: {', '.join(sorted(unknown))}")
+        
+        assignments, params = self._patch_assignments(fields)
+        query = f"UPDATE items SET {', '.join(assignments)} WHERE id = ?"
+        params.append(item_id)
+        if expected_version is not None:
+            query += " AND version = ?"
+            params.append(expected_version)
+        image_rows = _image_rows(fields)
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute(query, params)
+            if cursor.rowcount:
+                if 'tags' in fields:
+                    self._sync_tags(conn, 'item_tags', item_id, fields['tags'])
+                self._sync_images(conn, item_id, image_rows)
+                return True
+            if expected_version is not None:
+                exists = conn.execute("SELECT 1 FROM items WHERE id = ?", (item_id,)).fetchone()
+                if exists:
+                    raise ConcurrentUpdateError(
+                        f"Item {item_id} was modified since version {expected_version}"
+                    )
+            return False
+    
     def delete_item(self, item_id: int):
         try:
             with self.get_connection() as conn:
-                conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+                cursor = conn.execute("DELETE FROM items WHERE id = ?", (item_id,))
+                if cursor.rowcount == 0:
+                    # Archived items keep their children, so remove those by hand
+                    cursor = conn.execute("DELETE FROM items_archive WHERE id = ?", (item_id,))
+                    if cursor.rowcount:
+                        conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+                        conn.execute("DELETE FROM item_images WHERE item_id = ?", (item_id,))
         except Exception as e:
             raise Exception(f"Failed to delete item: {str(e)}")
     
+    def delete_items(self, item_ids: Iterable[int]) -> List[Dict]:
+        """Delete many items (live or archived) in one transaction
+        
+        Returns the deleted items' id and report_path so the caller can
+        remove their files afterwards (see utils.remove_item_files).
+        """
+        ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+        deleted = []
+        try:
+            with self.get_connection() as conn:
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    marks = ', '.join('?' for _ in chunk)
+                    for table in ('items', 'items_archive'):
+                        rows = conn.execute(
+                            f"SELECT id, report_path FROM {table} WHERE id IN ({marks})", chunk
+                        ).fetchall()
+                        deleted.extend(dict(row) for row in rows)
+                    conn.execute(f"DELETE FROM items WHERE id IN ({marks})", chunk)
+                    # Archived items keep their children, so remove those by hand
+                    for table in ('item_tags', 'item_images'):
+                        conn.execute(f"""
+                            DELETE FROM {table} WHERE item_id IN (
+                                SELECT id FROM items_archive WHERE id IN ({marks})
+                            )
+                        """, chunk)
+                    conn.execute(f"DELETE FROM items_archive WHERE id IN ({marks})", chunk)
+            return deleted
+        except Exception as e:
+            raise Exception(f"Failed to delete items: {str(e)}")
+    
+    def bulk_update_status(self, item_ids: Iterable[int], status: str, **fields) -> int:
+        """Set status (plus optional columns, e.g. final_sold_price) on many items
+        
+        Runs in one transaction and stamps date_listed/date_sold the same
+        way patch_item does. Returns the number of items updated.
+        """
+        if status not in ('Draft', 'Listed', 'Sold'):
+            raise ValueError(f"Invalid status {status!r}")
+        unknown = set(fields) - (PATCHABLE_ITEM_COLUMNS - {'tags', *IMAGE_ROLES})
+        if unknown:
+            raise ValueError(f"Cannot bulk update item columns: {', '.join(sorted(unknown))}")
+        
+        ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+        assignments, params = self._patch_assignments({'status': status, **fields})
+        updated = 0
+        try:
+            with self.get_connection() as conn:
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    cursor = conn.execute(
+                        f"UPDATE items SET {', '.join(assignments)} "
+                        f"WHERE id IN ({', '.join('?' for _ in chunk)})",
+                        params + chunk
+                    )
+                    updated += cursor.rowcount
+            return updated
+        except Exception as e:
+            raise Exception(f"Failed to update items: {str(e)}")
+    
+    def archive_sold_before(self, cutoff: str) -> int:
+        """Move items sold before cutoff (an ISO date) into items_archive
+        
+        Archived items drop out of listings, search and the dashboard
+        totals but keep their id, tags and images; get_item still finds
+        them and include_archive=True brings them back into scans.
+        Returns the number of items archived.
+        """
+        from datetime import datetime
+        
+        stored = ', '.join(column for column in ITEM_COLUMNS
+                           if column not in _GENERATED_ITEM_COLUMNS)
+        try:
+            with self.get_connection() as conn:
+                conn.execute(f"""
+                    INSERT INTO items_archive ({stored}, archived_at)
+                    SELECT {stored}, ? FROM items
+                    WHERE status = 'Sold' AND date_sold < ?
+                """, (datetime.now().isoformat(), cutoff))
+                # The items delete triggers update the full-text index, rollup and counter
+                cursor = conn.execute(
+                    "DELETE FROM items WHERE id IN (SELECT id FROM items_archive) "
+                    "AND status = 'Sold' AND date_sold < ?", (cutoff,)
+                )
+                return cursor.rowcount
+        except Exception as e:
+            raise Exception(f"Failed to archive items: {str(e)}")
+    
     def get_item(self, item_id: int) -> Optional[Dict]:
+        """Get one item, live or archived, including its image lists"""
         try:
             with self.get_connection() as conn:
                 row = conn.execute("SELECT * FROM items WHERE id = ?", (item_id,)).fetchone()
+                if row is None:
+                    row = conn.execute(
+                        f"SELECT {', '.join(ITEM_COLUMNS)}, archived_at FROM items_archive WHERE id = ?",
+                        (item_id,)
+                    ).fetchone()
                 if row:
-                    return self._row_to_dict(row)
+                    return self._attach_images(conn, [self._row_to_dict(row)])[0]
                 return None
         except Exception as e:
             raise Exception(f"Failed to get item: {str(e)}")
     
+    def get_item_images(self, item_id: int, role: str = None) -> List[Dict]:
+        """Image rows (path, role, ordinal, size and hash) for an item"""
+        query = "SELECT * FROM item_images WHERE item_id = ?"
+        params = [item_id]
+        if role is not None:
+            query += " AND role = ?"
+            params.append(role)
+        with self.get_connection() as conn:
+            rows = conn.execute(query + " ORDER BY role, ordinal", params).fetchall()
+            return [dict(row) for row in rows]
+    
+    def _attach_images(self, conn, items: List[Dict]) -> List[Dict]:
+        """Set image_urls_cache/selected_images path lists on item dicts in place"""
+        by_id = {}
+        for item in items:
+            for key in IMAGE_ROLES:
+                item[key] = []
+            by_id[item['id']] = item
+        roles = {role: key for key, role in IMAGE_ROLES.items()}
+        ids = list(by_id)
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"""
+                SELECT item_id, role, path FROM item_images
+                WHERE item_id IN ({', '.join('?' for _ in chunk)})
+                ORDER BY item_id, role, ordinal
+            """, chunk).fetchall()
+            for row in rows:
+                if row['role'] in roles:
+                    by_id[row['item_id']][roles[row['role']]].append(row['path'])
+        return items
+    
+    def _update_image_metadata(self, rows) -> int:
+        """Recompute size, dimensions and hash for item_images rows (id, path)
+        
+        The files are read before the write transaction starts.
+        """
+        updates = []
+        for row in rows:
+            metadata = _image_metadata(row['path'])
+            if metadata[0] is not None:
+                updates.append((*metadata, row['id']))
+        with self.get_connection() as conn:
+            conn.executemany("""
+                UPDATE item_images SET size_bytes = ?, width = ?, height = ?, content_hash = ?
+                WHERE id = ?
+            """, updates)
+        return len(updates)
+    
+    def backfill_image_metadata(self) -> int:
+        """Fill in size, dimensions and hash for image rows missing them
+        
+        Rows migrated from the old JSON columns start without metadata.
+        Returns the number of rows updated.
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, path FROM item_images WHERE size_bytes IS NULL"
+            ).fetchall()
+        return self._update_image_metadata(rows)
+    
+    def refresh_image_metadata(self, item_id: int) -> int:
+        """Recompute metadata for an item's images after the files changed"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT id, path FROM item_images WHERE item_id = ?", (item_id,)
+            ).fetchall()
+        return self._update_image_metadata(rows)
+    
+    def _item_filter_clause(self, search_query: str = None, status_filter: str = None,
+                            min_price: float = None, max_price: float = None,
+                            min_profit: float = None, max_profit: float = None,
+                            tags: List[str] = None, tag_mode: str = 'any',
+                            table: str = 'items'):
+        """Build the FROM/WHERE part of an item query
+        
+        table is 'items' or 'items_archive' (aliased as items, which has no
+        full-text index, so searches there use LIKE). Returns (sql, params,
+        rank_order) where rank_order is the relevance ORDER BY expression
+        when a full-text search is applied, else None.
+        """
+        sql = "FROM items" if table == 'items' else f"FROM {table} AS items"
+        conditions = []
+        params = []
+        rank_order = None
+        
+        match = _fts_match_query(search_query) if search_query else None
+        if match and table == 'items' and self.db_path in Database._fts_paths:
+            # Ranked full-text search; name matches weigh most, notes least
+            sql += " JOIN items_fts ON items_fts.rowid = items.id"
+            conditions.append("items_fts MATCH ?")
+            params.append(match)
+            rank_order = "bm25(items_fts, 10.0, 5.0, 1.0)"
+        elif search_query:
+            conditions.append("(items.item_name LIKE ? OR items.tags LIKE ? OR items.notes LIKE ?)")
+            params.extend([f"%{search_query}%", f"%{search_query}%", f"%{search_query}%"])
+        
+        if status_filter and status_filter != "All":
+            conditions.append("items.status = ?")
+            params.append(status_filter)
+        
+        if min_price is not None:
+            conditions.append("items.purchase_price >= ?")
+            params.append(min_price)
+        
+        if max_price is not None:
+            conditions.append("items.purchase_price <= ?")
+            params.append(max_price)
+        
+        if min_profit is not None:
+            conditions.append("items.potential_profit >= ?")
+            params.append(min_profit)
+        
+        if max_profit is not None:
+            conditions.append("items.potential_profit <= ?")
+            params.append(max_profit)
+        
+        tags = parse_tags(','.join(tags)) if tags else []
+        if tags:
+            tag_sql, tag_params = _tag_filter_sql('item_tags', 'items.id', tags, tag_mode)
+            conditions.append(tag_sql)
+            params.extend(tag_params)
+        
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params, rank_order
+    
+    def _item_list_query(self, filters: Dict, columns: Optional[Sequence[str]],
+                         include_archive: bool, sort_by: str = None, descending: bool = True):
+        """(sql, params) selecting filtered items, optionally with archived ones"""
+        filter_sql, params, rank_order = self._item_filter_clause(**filters)
+        direction = "DESC" if descending else "ASC"
+        if not include_archive:
+            if sort_by is not None:
+                order_by = f"items.{sort_by} {direction}, items.id {direction}"
+            elif rank_order:
+                order_by = f"{rank_order}, items.id DESC"
+            else:
+                order_by = "items.id DESC"
+            return f"SELECT {_item_select_list(columns)} {filter_sql} ORDER BY {order_by}", params
+        
+        # Archived rows have no relevance rank, so a combined search is newest first
+        select_list = _item_select_list(columns or ITEM_COLUMNS)
+        archive_sql, archive_params, _ = self._item_filter_clause(**filters, table='items_archive')
+        order_by = f"{sort_by} {direction}, id {direction}" if sort_by is not None else "id DESC"
+        query = (f"SELECT {select_list} {filter_sql} UNION ALL "
+                 f"SELECT {select_list} {archive_sql} ORDER BY {order_by}")
+        return query, params + archive_params
+    
     def get_all_items(self, search_query: str = None, status_filter: str = None, 
                       min_price: float = None, max_price: float = None,
-                      min_profit: float = None, max_profit: float = None) -> List[Dict]:
+                      min_profit: float = None, max_profit: float = None,
+                      sort_by: str = None, descending: bool = True,
+                      tags: List[str] = None, tag_mode: str = 'any',
+                      include_images: bool = False,
+                      columns: Sequence[str] = None,
+                      include_archive: bool = False) -> List[Dict]:
+        """Get items matching the filters
+        
+        Archived items are only included with include_archive=True.
+        
+        Image lists are only loaded with include_images=True (exports and
+        report generation); listings do not need them. With columns (e.g.
+        ITEM_LIST_COLUMNS), only those columns are selected and compact
+        Item records are returned instead of dicts.
+        
+        Profit filters apply to potential profit (target price minus all
+        expenses). tags matches items with any (tag_mode='any') or all
+        (tag_mode='all') of the given tags. sort_by is one of
+        ITEM_SORT_COLUMNS; without it, search results are ranked by
+        relevance and everything else is newest first.
+        """
+        if sort_by is not None and sort_by not in ITEM_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort items by {sort_by!r}")
         try:
             with self.get_connection() as conn:
-                query = "SELECT * FROM items WHERE 1=1"
-                params = []
-                
-                if search_query:
-                    query += " AND (item_name LIKE ? OR tags LIKE ? OR notes LIKE ?)"
-                    params.extend([f"%{search_query}%", f"%{search_query}%", f"%{search_query}%"])
-                
-                if status_filter and status_filter != "All":
-                    query += " AND status = ?"
-                    params.append(status_filter)
-                
-                if min_price is not None:
-                    query += " AND purchase_price >= ?"
-                    params.append(min_price)
-                
-                if max_price is not None:
-                    query += " AND purchase_price <= ?"
-                    params.append(max_price)
-                
-                query += " ORDER BY id DESC"
-                
+                query, params = self._item_list_query(
+                    dict(search_query=search_query, status_filter=status_filter,
+                         min_price=min_price, max_price=max_price, min_profit=min_profit,
+                         max_profit=max_profit, tags=tags, tag_mode=tag_mode),
+                    columns, include_archive, sort_by, descending
+                )
                 rows = conn.execute(query, params).fetchall()
-                items = [self._row_to_dict(row) for row in rows]
-                
-                # Filter by profit if specified (can't do in SQL easily)
-                if min_profit is not None or max_profit is not None:
-                    filtered_items = []
-                    for item in items:
-                        total_expenses = (
-                            item['purchase_price'] + item['shipping_cost'] +
-                            item.get('listing_fee', 0) + item.get('processing_fee', 0) +
-                            item.get('storage_cost', 0) + item.get('other_expenses', 0)
-                        )
-                        profit = item['target_price'] - total_expenses
-                        
-                        if min_profit is not None and profit < min_profit:
-                            continue
-                        if max_profit is not None and profit > max_profit:
-                            continue
-                        filtered_items.append(item)
-                    return filtered_items
-                
+                if columns is None:
+                    items = [self._row_to_dict(row) for row in rows]
+                else:
+                    items = [Item(row) for row in rows]
+                if include_images:
+                    self._attach_images(conn, items)
                 return items
         except Exception as e:
             raise Exception(f"Failed to get items: {str(e)}")
     
+    def iter_items(self, search_query: str = None, status_filter: str = None,
+                   min_price: float = None, max_price: float = None,
+                   min_profit: float = None, max_profit: float = None,
+                   tags: List[str] = None, tag_mode: str = 'any',
+                   include_images: bool = False, columns: Sequence[str] = None,
+                   chunk_size: int = 500, include_archive: bool = False) -> Iterator[Dict]:
+        """Yield items matching the filters, newest first, chunk_size rows at a time
+        
+        Unlike get_all_items, only one chunk is held in memory, so this is
+        what whole-inventory scans (exports, master index) should use. The
+        scan reads one consistent snapshot on its own connection; writes made
+        while iterating are not seen. Items are dicts, or Item records when
+        columns is given. Archived items are only included with
+        include_archive=True.
+        """
+        query, params = self._item_list_query(
+            dict(search_query=search_query, status_filter=status_filter,
+                 min_price=min_price, max_price=max_price, min_profit=min_profit,
+                 max_profit=max_profit, tags=tags, tag_mode=tag_mode),
+            columns, include_archive
+        )
+        with self.pool.reader() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if columns is None:
+                    chunk = [self._row_to_dict(row) for row in rows]
+                else:
+                    chunk = [Item(row) for row in rows]
+                if include_images:
+                    self._attach_images(conn, chunk)
+                yield from chunk
+    
+    def get_items_page(self, search_query: str = None, status_filter: str = None,
+                       min_price: float = None, max_price: float = None,
+                       min_profit: float = None, max_profit: float = None,
+                       sort_by: str = None, descending: bool = True,
+                       cursor: str = None, page_size: int = 50,
+                       tags: List[str] = None, tag_mode: str = 'any') -> Dict:
+        """Get one page of items using keyset pagination
+        
+        Items are Item records holding only ITEM_LIST_COLUMNS. Pages are
+        addressed by an opaque cursor taken from the previous
+        result's next_cursor/prev_cursor, so fetching page N costs the same
+        as page 1. sort_by is one of KEYSET_SORT_COLUMNS (ties break on id);
+        when None, full-text searches are ranked best match first (sort_by
+        'rank', items carry their search_rank) and other listings use 'id'.
+        
+        Returns:
+            Dict with items, total (matching rows), next_cursor and prev_cursor
+            (None at either end), sort_by, descending and page_size
+        """
+        if sort_by is not None and sort_by not in KEYSET_SORT_COLUMNS:
+            raise ValueError(f"Cannot page items by {sort_by!r}")
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        try:
+            position = _decode_cursor(cursor) if cursor else None
+            with self.get_connection() as conn:
+                filter_sql, params, rank_order = self._item_filter_clause(
+                    search_query, status_filter, min_price, max_price, min_profit, max_profit,
+                    tags, tag_mode
+                )
+                total = conn.execute(f"SELECT COUNT(*) {filter_sql}", params).fetchone()[0]
+                
+                select_list = _item_select_list(ITEM_LIST_COLUMNS)
+                if sort_by is None:
+                    sort_by = 'rank' if rank_order else 'id'
+                if sort_by == 'rank':
+                    # Negated bm25, so best match then newest is one descending
+                    # keyset, the same order get_all_items gives a search
+                    sort_key, cursor_key, descending = f"-{rank_order}", 'search_rank', True
+                    select_list += f", {sort_key} AS search_rank"
+                else:
+                    sort_key, cursor_key = f"items.{sort_by}", sort_by
+                
+                backwards = position is not None and position['dir'] == 'prev'
+                # Walking backwards flips both the comparison and the scan order
+                scan_desc = descending != backwards
+                direction = "DESC" if scan_desc else "ASC"
+                query = f"SELECT {select_list} {filter_sql}"
+                page_params = list(params)
+                if position is not None:
+                    keyset = f"({sort_key}, items.id) {'<' if scan_desc else '>'} (?, ?)"
+                    query += (" AND " if " WHERE " in filter_sql else " WHERE ") + keyset
+                    page_params.extend([position['value'], position['id']])
+                query += f" ORDER BY {sort_key} {direction}, items.id {direction} LIMIT ?"
+                page_params.append(page_size + 1)
+                
+                rows = conn.execute(query, page_params).fetchall()
+                has_more = len(rows) > page_size
+                rows = rows[:page_size]
+                if backwards:
+                    rows.reverse()
+                items = [Item(row) for row in rows]
+            
+            has_next = has_more if not backwards else True
+            has_prev = has_more if backwards else position is not None
+            return {
+                'items': items,
+                'total': total,
+                'next_cursor': _encode_cursor(items[-1], cursor_key, 'next') if items and has_next else None,
+                'prev_cursor': _encode_cursor(items[0], cursor_key, 'prev') if items and has_prev else None,
+                'sort_by': sort_by,
+                'descending': descending,
+                'page_size': page_size,
+            }
+        except Exception as e:
+            raise Exception(f"Failed to get items page: {str(e)}")
+    
     def update_report_path(self, item_id: int, report_path: str):
-        with self.get_connection() as conn:
-            conn.execute("UPDATE items SET report_path = ? WHERE id = ?", (report_path, item_id))
+        """Record an item's rendered report, live or archived
+        
+        The report file only caches the item's data, so it may be set on
+        archived items even though their other fields are read-only.
+        """
+        if not self.patch_item(item_id, report_path=report_path):
+            with self.get_connection() as conn:
+                conn.execute("UPDATE items_archive SET report_path = ? WHERE id = ?",
+                             (report_path, item_id))
     
     def _row_to_dict(self, row) -> Dict:
-        data = dict(row)
-        if data.get('image_urls_cache'):
-            data['image_urls_cache'] = json.loads(data['image_urls_cache'])
-        else:
-            data['image_urls_cache'] = []
-        if data.get('selected_images'):
-            data['selected_images'] = json.loads(data['selected_images'])
-        else:
-            data['selected_images'] = []
+        return dict(row)
+    
+    def get_summary_stats(self, include_archive: bool = False) -> Dict:
+        """Dashboard totals read from the trigger-maintained stats rollup
+        
+        With include_archive=True the archived items are added in, for
+        lifetime figures.
+        """
+        totals = self.get_rollup('global')
+        totals = totals[0] if totals else {name: 0 for name, _ in ROLLUP_MEASURES}
+        if include_archive:
+            sums = ', '.join(f"COALESCE(SUM({expr.format(r='items_archive')}), 0)"
+                             for _, expr in ROLLUP_MEASURES)
+            with self.get_connection() as conn:
+                archived = conn.execute(f"SELECT {sums} FROM items_archive").fetchone()
+            totals = {name: totals[name] + archived[i]
+                      for i, (name, _) in enumerate(ROLLUP_MEASURES)}
+        stats = {
+            'total_items': int(totals['item_count']),
+            'total_potential_profit': totals['potential_profit'],
+            'total_actual_profit': totals['actual_profit'],
+            'inventory_value': totals['inventory_value'],
+            'total_invested': totals['total_invested'],
+            'total_revenue': totals['revenue'],
+            'sold_count': int(totals['sold_count']),
+            'listed_count': int(totals['listed_count']),
+            'draft_count': int(totals['draft_count']),
+        }
+        total_invested = stats['total_invested']
+        stats['roi'] = (
+            (stats['total_revenue'] - total_invested) / total_invested * 100
+        ) if total_invested > 0 else 0
+        return stats
+    
+    def get_recent_items(self, limit: int = 10) -> List[Item]:
+        """The most recently added items as Item records (ITEM_LIST_COLUMNS only)"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                f"SELECT {_item_select_list(ITEM_LIST_COLUMNS)} FROM items ORDER BY items.id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+            return [Item(row) for row in rows]
+    
+    def get_dashboard_data(self, recent_limit: int = 10) -> Dict:
+        """Summary stats and recent items for the dashboard
+        
+        One LIMITed query plus the stats rollup, cached until
+        data_version() changes. Returns a dict with stats, recent_items
+        and data_version; treat it as read-only since it is shared.
+        """
+        key = (self.db_path, recent_limit)
+        version = self.data_version()
+        cached = Database._dashboard_cache.get(key)
+        if cached is not None and cached['data_version'] == version:
+            return cached
+        # Read under the version fetched first; a concurrent write only makes the next call reload
+        data = {
+            'stats': self.get_summary_stats(),
+            'recent_items': self.get_recent_items(recent_limit),
+            'data_version': version,
+        }
+        Database._dashboard_cache[key] = data
         return data
     
-    def get_summary_stats(self) -> Dict:
+    def get_rollup(self, scope: str) -> List[Dict]:
+        """Rollup rows for one scope ('global', 'status', 'channel', 'provider'
+        or 'category'), largest actual profit first"""
+        if scope not in dict(ROLLUP_SCOPES):
+            raise ValueError(f"Unknown rollup scope {scope!r}")
         with self.get_connection() as conn:
-            items = self.get_all_items()
-            total_items = len(items)
-            
-            # Calculate total expenses per item
-            def get_total_expenses(item):
-                return (
-                    item['purchase_price'] + 
-                    item['shipping_cost'] + 
-                    item.get('listing_fee', 0) + 
-                    item.get('processing_fee', 0) + 
-                    item.get('storage_cost', 0) + 
-                    item.get('other_expenses', 0)
-                )
-            
-            # Potential profit (for unsold items)
-            total_potential_profit = sum(
-                (item['target_price'] - get_total_expenses(item))
-                for item in items if item['status'] != 'Sold'
-            )
-            
-            # Actual profit (for sold items)
-            total_actual_profit = sum(
-                (item['final_sold_price'] - get_total_expenses(item))
-                for item in items if item['status'] == 'Sold' and item['final_sold_price']
-            )
-            
-            # Inventory value (unsold items)
-            inventory_value = sum(
-                get_total_expenses(item)
-                for item in items if item['status'] != 'Sold'
-            )
-            
-            # Total invested
-            total_invested = sum(get_total_expenses(item) for item in items)
-            
-            # ROI calculation
-            total_revenue = sum(
-                item['final_sold_price']
-                for item in items if item['status'] == 'Sold' and item['final_sold_price']
-            )
-            roi = ((total_revenue - total_invested) / total_invested * 100) if total_invested > 0 else 0
-            
-            return {
-                'total_items': total_items,
-                'total_potential_profit': total_potential_profit,
-                'total_actual_profit': total_actual_profit,
-                'inventory_value': inventory_value,
-                'total_invested': total_invested,
-                'total_revenue': total_revenue,
-                'roi': roi,
-                'sold_count': len([i for i in items if i['status'] == 'Sold']),
-                'listed_count': len([i for i in items if i['status'] == 'Listed']),
-                'draft_count': len([i for i in items if i['status'] == 'Draft'])
-            }
+            rows = conn.execute(
+                "SELECT * FROM stats_rollup WHERE scope = ? ORDER BY actual_profit DESC, key ASC",
+                (scope,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+    
+    def rebuild_rollups(self) -> List[tuple]:
+        """Recompute the stats rollup from scratch
+        
+        Returns the (scope, key) pairs whose stored totals had drifted from
+        the recomputed ones, so an empty list means the triggers were exact.
+        """
+        def snapshot(conn):
+            return {(row['scope'], row['key']): tuple(row)[2:]
+                    for row in conn.execute("SELECT * FROM stats_rollup")}
+        
+        with self.get_connection() as conn:
+            before = snapshot(conn)
+            rebuild_stats_rollup(conn)
+            after = snapshot(conn)
+        drifted = []
+        for key in sorted(set(before) | set(after)):
+            old, new = before.get(key), after.get(key)
+            if old is None or new is None or any(abs(a - b) > 1e-6 for a, b in zip(old, new)):
+                drifted.append(key)
+        return drifted
     
     # Provider methods
+    _PROVIDER_INSERT_SQL = """
+        INSERT INTO providers (name, contact_person, phone, email, website, notes, tags, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+    """
+    
+    def _provider_insert_params(self, provider_data: Dict) -> tuple:
+        return (
+            provider_data['name'],
+            provider_data.get('contact_person', ''),
+            provider_data.get('phone', ''),
+            provider_data.get('email', ''),
+            provider_data.get('website', ''),
+            provider_data.get('notes', ''),
+            provider_data.get('tags', '')
+        )
+    
     def add_provider(self, provider_data: Dict) -> int:
         try:
             with self.get_connection() as conn:
-                cursor = conn.execute("""
-                    INSERT INTO providers (name, contact_person, phone, email, website, notes, tags)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    provider_data['name'],
-                    provider_data.get('contact_person', ''),
-                    provider_data.get('phone', ''),
-                    provider_data.get('email', ''),
-                    provider_data.get('website', ''),
-                    provider_data.get('notes', ''),
-                    provider_data.get('tags', '')
-                ))
+                cursor = conn.execute(self._PROVIDER_INSERT_SQL, self._provider_insert_params(provider_data))
+                self._sync_provider_children(conn, [cursor.lastrowid], [provider_data])
                 return cursor.lastrowid
         except Exception as e:
             raise Exception(f"Failed to add provider: {str(e)}")
     
+    def add_providers_bulk(self, providers: Iterable[Dict], batch_size: int = 1000) -> List[int]:
+        """Insert many providers with batched executemany transactions
+        
+        Returns:
+            The new provider ids, in input order
+        """
+        try:
+            return self._insert_batches(
+                self._PROVIDER_INSERT_SQL, providers, batch_size,
+                self._provider_insert_params, self._sync_provider_children
+            )
+        except Exception as e:
+            raise Exception(f"Failed to add providers: {str(e)}")
+    
     def update_provider(self, provider_id: int, provider_data: Dict):
         try:
             with self.get_connection() as conn:
@@ -368,6 +1281,7 @@ class Database:
                     provider_data.get('tags', ''),
                     provider_id
                 ))
+                self._sync_tags(conn, 'provider_tags', provider_id, provider_data.get('tags', ''))
         except Exception as e:
             raise Exception(f"Failed to update provider: {str(e)}")
     
@@ -376,6 +1290,8 @@ class Database:
             with self.get_connection() as conn:
                 # Set provider_id to NULL for items using this provider
                 conn.execute("UPDATE items SET provider_id = NULL WHERE provider_id = ?", (provider_id,))
+                conn.execute("UPDATE items_archive SET provider_id = NULL WHERE provider_id = ?",
+                             (provider_id,))
                 # Delete provider
                 conn.execute("DELETE FROM providers WHERE id = ?", (provider_id,))
         except Exception as e:
@@ -391,23 +1307,50 @@ class Database:
         except Exception as e:
             raise Exception(f"Failed to get provider: {str(e)}")
     
-    def get_all_providers(self, search_query: str = None) -> List[Dict]:
+    def get_all_providers(self, search_query: str = None, tags: List[str] = None,
+                          tag_mode: str = 'any') -> List[Dict]:
         try:
             with self.get_connection() as conn:
-                query = "SELECT * FROM providers WHERE 1=1"
+                match = _fts_match_query(search_query) if search_query else None
+                conditions = []
                 params = []
-                
-                if search_query:
-                    query += " AND (name LIKE ? OR tags LIKE ?)"
+                query = "SELECT providers.* FROM providers"
+                order_by = "providers.name ASC"
+                if match and self.db_path in Database._fts_paths:
+                    query += " JOIN providers_fts ON providers_fts.rowid = providers.id"
+                    conditions.append("providers_fts MATCH ?")
+                    params.append(match)
+                    order_by = "bm25(providers_fts, 10.0, 5.0), providers.name ASC"
+                elif search_query:
+                    conditions.append("(providers.name LIKE ? OR providers.tags LIKE ?)")
                     params.extend([f"%{search_query}%", f"%{search_query}%"])
                 
-                query += " ORDER BY name ASC"
+                tags = parse_tags(','.join(tags)) if tags else []
+                if tags:
+                    tag_sql, tag_params = _tag_filter_sql('provider_tags', 'providers.id', tags, tag_mode)
+                    conditions.append(tag_sql)
+                    params.extend(tag_params)
                 
+                if conditions:
+                    query += " WHERE " + " AND ".join(conditions)
+                query += f" ORDER BY {order_by}"
                 rows = conn.execute(query, params).fetchall()
-                return [dict(row) for row in rows]
+                return [Provider(row) for row in rows]
         except Exception as e:
             raise Exception(f"Failed to get providers: {str(e)}")
     
+    def get_tag_counts(self, kind: str = 'items') -> List[Dict]:
+        """Tags in use with how many items (or providers) carry each, most used first"""
+        tag_table = {'items': 'item_tags', 'providers': 'provider_tags'}.get(kind)
+        if tag_table is None:
+            raise ValueError(f"Unknown tag kind {kind!r}")
+        with self.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT tag, COUNT(*) AS count FROM {tag_table}
+                GROUP BY tag ORDER BY count DESC, tag ASC
+            """).fetchall()
+            return [dict(row) for row in rows]
+    
     def get_provider_items(self, provider_id: int) -> List[Dict]:
         """Get all items from a specific provider"""
         try:
@@ -434,26 +1377,201 @@ class Database:
                 return 0
         return 0
     
+    # Per-provider aggregates; profits count purchase and shipping cost only
+    _PROVIDER_STATS_SQL = """
+        SELECT
+            provider_id,
+            COUNT(*) AS total_items,
+            TOTAL(purchase_price + shipping_cost) AS total_spent,
+            TOTAL(target_price - purchase_price - shipping_cost) AS total_potential_profit,
+            TOTAL(CASE WHEN status = 'Sold' AND final_sold_price
+                       THEN final_sold_price - purchase_price - shipping_cost END) AS total_actual_profit,
+            COUNT(CASE WHEN status = 'Sold' THEN 1 END) AS sold_count
+        FROM items
+    """
+    
+    @staticmethod
+    def _provider_stats_from_row(row) -> Dict:
+        if row is None:
+            stats = {'total_items': 0, 'total_spent': 0, 'total_potential_profit': 0,
+                     'total_actual_profit': 0, 'sold_count': 0}
+        else:
+            stats = {key: row[key] for key in ('total_items', 'total_spent', 'total_potential_profit',
+                                               'total_actual_profit', 'sold_count')}
+        sold_count = stats['sold_count']
+        stats['avg_profit_per_item'] = stats['total_actual_profit'] / sold_count if sold_count > 0 else 0
+        return stats
+    
     def get_provider_stats(self, provider_id: int) -> Dict:
         """Get statistics for a provider"""
-        items = self.get_provider_items(provider_id)
-        total_items = len(items)
-        total_spent = sum(item['purchase_price'] + item['shipping_cost'] for item in items)
-        total_potential_profit = sum(
-            (item['target_price'] - item['purchase_price'] - item['shipping_cost'])
-            for item in items
-        )
-        total_actual_profit = sum(
-            (item['final_sold_price'] - item['purchase_price'] - item['shipping_cost'])
-            for item in items if item['status'] == 'Sold' and item['final_sold_price']
-        )
-        sold_count = len([i for i in items if i['status'] == 'Sold'])
-        
-        return {
-            'total_items': total_items,
-            'total_spent': total_spent,
-            'total_potential_profit': total_potential_profit,
-            'total_actual_profit': total_actual_profit,
-            'sold_count': sold_count,
-            'avg_profit_per_item': total_actual_profit / sold_count if sold_count > 0 else 0
-        }
+        with self.get_connection() as conn:
+            row = conn.execute(
+                self._PROVIDER_STATS_SQL + " WHERE provider_id = ? GROUP BY provider_id", (provider_id,)
+            ).fetchone()
+            return self._provider_stats_from_row(row)
+    
+    def get_all_provider_stats(self) -> List[Dict]:
+        """Get statistics for every provider in one grouped query
+        
+        Returns:
+            List of {'provider', 'stats', 'rank'} dicts ranked by actual
+            (sold) profit, best first; providers without items are included
+        """
+        stat_columns = ('total_items', 'total_spent', 'total_potential_profit',
+                        'total_actual_profit', 'sold_count')
+        try:
+            with self.get_connection() as conn:
+                rows = conn.execute(f"""
+                    SELECT providers.*, {', '.join('s.' + column for column in stat_columns)}
+                    FROM providers
+                    LEFT JOIN ({self._PROVIDER_STATS_SQL} WHERE provider_id IS NOT NULL GROUP BY provider_id) s
+                        ON s.provider_id = providers.id
+                    ORDER BY COALESCE(s.total_actual_profit, 0) DESC, providers.name ASC
+                """).fetchall()
+            
+            results = []
+            for rank, row in enumerate(rows, start=1):
+                provider = {key: row[key] for key in row.keys() if key not in stat_columns}
+                has_items = row['total_items'] is not None
+                results.append({
+                    'provider': provider,
+                    'stats': self._provider_stats_from_row(row if has_items else None),
+                    'rank': rank
+                })
+            return results
+        except Exception as e:
+            raise Exception(f"Failed to get provider stats: {str(e)}")
+    
+    # Background jobs (see jobs.py)
+    
+    def _job_from_row(self, row) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+        return job
+    
+    def add_job(self, kind: str, item_id: int = None, payload: Dict = None,
+                max_attempts: int = 3) -> int:
+        """Record a pending job and return its id"""
+        from datetime import datetime
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                INSERT INTO jobs (kind, item_id, payload, max_attempts, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (kind, item_id, json.dumps(payload) if payload else None, max_attempts,
+                  datetime.now().isoformat()))
+            return cursor.lastrowid
+    
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job_from_row(row)
+    
+    def get_latest_item_job(self, item_id: int, kind: str = None) -> Optional[Dict]:
+        """The item's most recent job (of the given kind), or None"""
+        query = "SELECT * FROM jobs WHERE item_id = ?"
+        params = [item_id]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self.get_connection() as conn:
+            row = conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+            return self._job_from_row(row)
+    
+    def find_pending_job(self, kind: str, item_id: int) -> Optional[int]:
+        """Id of a not-yet-started job of this kind for the item, if any"""
+        with self.get_connection() as conn:
+            row = conn.execute("""
+                SELECT id FROM jobs WHERE item_id = ? AND kind = ? AND status = 'pending'
+                ORDER BY id DESC LIMIT 1
+            """, (item_id, kind)).fetchone()
+            return row['id'] if row else None
+    
+    def start_job(self, job_id: int) -> Optional[Dict]:
+        """Mark a pending job running and count the attempt; None if it was not pending"""
+        from datetime import datetime
+        
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?
+                WHERE id = ? AND status = 'pending'
+            """, (datetime.now().isoformat(), job_id))
+            if not cursor.rowcount:
+                return None
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._job_from_row(row)
+    
+    def finish_job(self, job_id: int, error: str = None, retry: bool = False):
+        """Mark a running job done, failed, or pending again for a retry"""
+        from datetime import datetime
+        
+        status = 'done' if error is None else ('pending' if retry else 'failed')
+        with self.get_connection() as conn:
+            conn.execute("""
+                UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?
+            """, (status, error, datetime.now().isoformat(), job_id))
+    
+    def get_unfinished_jobs(self) -> List[Dict]:
+        """Pending jobs plus running ones, oldest first (running ones were interrupted
+        if no worker of this process owns them)"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('pending', 'running') ORDER BY id"
+            ).fetchall()
+            return [self._job_from_row(row) for row in rows]
+
+
+if hasattr(os, 'register_at_fork'):
+    # Pre-forking servers (gunicorn) may import the app before starting workers
+    os.register_at_fork(after_in_child=Database._after_fork)
+
+
+if __name__ == "__main__":
+    # Maintenance commands for the database file
+    import sys
+    
+    if len(sys.argv) < 2:
+        print("FlipTrack Database Maintenance")
+        print("\nUsage:")
+        print("  python database.py migrate [db_path]")
+        print("  python database.py rebuild-rollups [db_path]")
+        print("  python database.py archive YYYY-MM-DD [db_path]")
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    args = sys.argv[2:]
+    if command == "archive":
+        if not args:
+            print("Error: archive needs a cutoff date (YYYY-MM-DD)")
+            sys.exit(1)
+        cutoff = args.pop(0)
+    db_path = args[0] if args else "tracker.db"
+    
+    try:
+        if command == "migrate":
+            db = Database(db_path)
+            with db.get_connection() as conn:
+                print(f"Schema version: {get_schema_version(conn)}")
+        
+        elif command == "rebuild-rollups":
+            drifted = Database(db_path).rebuild_rollups()
+            if drifted:
+                print(f"Rebuilt stats rollup; {len(drifted)} rows had drifted:")
+                for scope, key in drifted:
+                    print(f"  {scope}: {key!r}")
+            else:
+                print("Rebuilt stats rollup; stored totals were exact")
+        
+        elif command == "archive":
+            archived = Database(db_path).archive_sold_before(cutoff)
+            print(f"Archived {archived} items sold before {cutoff}")
+        
+        else:
+            print(f"Error: Unknown command '{command}'")
+            sys.exit(1)
+    
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
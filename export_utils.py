@@ -3,14 +3,107 @@ Export and backup utilities for FlipTrack
 """
 
 import csv
+import io
+import itertools
 import json
 import shutil
+import zlib
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterable, Iterator, List, Dict
 from database import Database
 
 
+# CSV columns for file and streaming exports; import_from_csv reads the same headers
+CSV_FIELDNAMES = [
+    'ID', 'Item Name', 'Category', 'Status', 'Condition',
+    'Purchase Price', 'Shipping Cost', 'Listing Fee', 'Processing Fee', 
+    'Storage Cost', 'Other Expenses', 'Target Price', 'Final Sold Price',
+    'Potential Profit', 'Actual Profit',
+    'Sales Channel', 'Product URL', 'Listing URL',
+    'Tags', 'Notes', 'Storage Location',
+    'Report Path', 'Image Count'
+]
+
+
+def item_to_csv_row(item: Dict) -> Dict:
+    """CSV row (keyed by CSV_FIELDNAMES) for an item loaded with include_images=True"""
+    potential_profit = item['potential_profit']
+    actual_profit = item['actual_profit'] or 0
+    
+    image_count = len(item.get('selected_images', []))
+    
+    return {
+        'ID': item['id'],
+        'Item Name': item['item_name'],
+        'Category': item.get('category', ''),
+        'Status': item['status'],
+        'Condition': item.get('condition', ''),
+        'Purchase Price': f"{item['purchase_price']:.2f}",
+        'Shipping Cost': f"{item['shipping_cost']:.2f}",
+        'Listing Fee': f"{item.get('listing_fee', 0):.2f}",
+        'Processing Fee': f"{item.get('processing_fee', 0):.2f}",
+        'Storage Cost': f"{item.get('storage_cost', 0):.2f}",
+        'Other Expenses': f"{item.get('other_expenses', 0):.2f}",
+        'Target Price': f"{item['target_price']:.2f}",
+        'Final Sold Price': f"{item['final_sold_price']:.2f}" if item.get('final_sold_price') else '',
+        'Potential Profit': f"{potential_profit:.2f}",
+        'Actual Profit': f"{actual_profit:.2f}" if item['status'] == 'Sold' else '',
+        'Sales Channel': item.get('sales_channel', ''),
+        'Product URL': item.get('product_url', ''),
+        'Listing URL': item.get('listing_url', ''),
+        'Tags': item.get('tags', ''),
+        'Notes': item.get('notes', ''),
+        'Storage Location': item.get('storage_location', ''),
+        'Report Path': item.get('report_path', ''),
+        'Image Count': image_count
+    }
+
+
+def iter_csv(items: Iterable[Dict], batch_size: int = 500) -> Iterator[str]:
+    """CSV text for items, yielded as the header and then batch_size rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDNAMES)
+    
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+    
+    writer.writeheader()
+    yield flush()
+    for count, item in enumerate(items, start=1):
+        writer.writerow(item_to_csv_row(item))
+        if count % batch_size == 0:
+            yield flush()
+    text = flush()
+    if text:
+        yield text
+
+
+def iter_ndjson(items: Iterable[Dict], batch_size: int = 500) -> Iterator[str]:
+    """Newline-delimited JSON for items, one object per line, batch_size lines at a time"""
+    lines = []
+    for item in items:
+        lines.append(json.dumps(dict(item), ensure_ascii=False) + '\n')
+        if len(lines) == batch_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 def export_to_csv(output_path: str = None) -> str:
     """Export all items to CSV file
     
@@ -25,59 +118,14 @@ def export_to_csv(output_path: str = None) -> str:
         output_path = f"fliptrack_export_{timestamp}.csv"
     
     db = Database()
-    items = db.get_all_items()
+    items = db.iter_items(include_images=True)
+    first_item = next(items, None)
     
-    if not items:
+    if first_item is None:
         raise Exception("No items to export")
     
-    # Define CSV columns
-    fieldnames = [
-        'ID', 'Item Name', 'Category', 'Status', 'Condition',
-        'Purchase Price', 'Shipping Cost', 'Listing Fee', 'Processing Fee', 
-        'Storage Cost', 'Other Expenses', 'Target Price', 'Final Sold Price',
-        'Potential Profit', 'Actual Profit',
-        'Sales Channel', 'Product URL', 'Listing URL',
-        'Tags', 'Notes', 'Storage Location',
-        'Report Path', 'Image Count'
-    ]
-    
     with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for item in items:
-            potential_profit = item['target_price'] - item['purchase_price'] - item['shipping_cost']
-            actual_profit = 0
-            if item['status'] == 'Sold' and item.get('final_sold_price'):
-                actual_profit = item['final_sold_price'] - item['purchase_price'] - item['shipping_cost']
-            
-            image_count = len(item.get('selected_images', []))
-            
-            writer.writerow({
-                'ID': item['id'],
-                'Item Name': item['item_name'],
-                'Category': item.get('category', ''),
-                'Status': item['status'],
-                'Condition': item.get('condition', ''),
-                'Purchase Price': f"{item['purchase_price']:.2f}",
-                'Shipping Cost': f"{item['shipping_cost']:.2f}",
-                'Listing Fee': f"{item.get('listing_fee', 0):.2f}",
-                'Processing Fee': f"{item.get('processing_fee', 0):.2f}",
-                'Storage Cost': f"{item.get('storage_cost', 0):.2f}",
-                'Other Expenses': f"{item.get('other_expenses', 0):.2f}",
-                'Target Price': f"{item['target_price']:.2f}",
-                'Final Sold Price': f"{item['final_sold_price']:.2f}" if item.get('final_sold_price') else '',
-                'Potential Profit': f"{potential_profit:.2f}",
-                'Actual Profit': f"{actual_profit:.2f}" if item['status'] == 'Sold' else '',
-                'Sales Channel': item.get('sales_channel', ''),
-                'Product URL': item.get('product_url', ''),
-                'Listing URL': item.get('listing_url', ''),
-                'Tags': item.get('tags', ''),
-                'Notes': item.get('notes', ''),
-                'Storage Location': item.get('storage_location', ''),
-                'Report Path': item.get('report_path', ''),
-                'Image Count': image_count
-            })
+        csvfile.writelines(iter_csv(itertools.chain([first_item], items)))
     
     return output_path
 
@@ -96,17 +144,21 @@ def export_to_json(output_path: str = None) -> str:
         output_path = f"fliptrack_backup_{timestamp}.json"
     
     db = Database()
-    items = db.get_all_items()
-    
-    backup_data = {
-        'export_date': datetime.now().isoformat(),
-        'version': '1.0',
-        'item_count': len(items),
-        'items': items
-    }
     
+    # Written item by item so the whole inventory is never held in memory;
+    # the layout matches json.dump(backup_data, indent=2)
+    item_count = 0
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, indent=2, ensure_ascii=False)
+        f.write('{\n')
+        f.write(f'  "export_date": {json.dumps(datetime.now().isoformat())},\n')
+        f.write('  "version": "1.0",\n')
+        f.write('  "items": [')
+        for item in db.iter_items(include_images=True):
+            f.write(',\n    ' if item_count else '\n    ')
+            f.write(json.dumps(item, indent=2, ensure_ascii=False).replace('\n', '\n    '))
+            item_count += 1
+        f.write('\n  ]' if item_count else ']')
+        f.write(f',\n  "item_count": {item_count}\n}}\n')
     
     return output_path
 
@@ -127,10 +179,10 @@ def create_full_backup(backup_dir: str = None) -> str:
     backup_path = Path(backup_dir)
     backup_path.mkdir(exist_ok=True)
     
-    # Backup database
+    # Backup database (copying the file alone would miss commits still in tracker.db-wal)
     db_path = Path("tracker.db")
     if db_path.exists():
-        shutil.copy2(db_path, backup_path / "tracker.db")
+        Database(str(db_path)).backup(str(backup_path / "tracker.db"))
     
     # Backup images
     images_dir = Path("data/images")
@@ -175,20 +227,23 @@ def restore_from_json(json_path: str) -> int:
         backup_data = json.load(f)
     
     items = backup_data.get('items', [])
+    required = ('item_name', 'purchase_price', 'shipping_cost', 'target_price')
     
-    db = Database()
-    restored_count = 0
-    
-    for item in items:
-        try:
+    def valid_items():
+        for item in items:
+            missing = [field for field in required if item.get(field) is None]
+            if missing:
+                print(f"Warning: Failed to restore item {item.get('item_name')}: missing {', '.join(missing)}")
+                continue
             # Remove id to let database auto-generate
-            item_data = {k: v for k, v in item.items() if k != 'id'}
-            db.add_item(item_data)
-            restored_count += 1
-        except Exception as e:
-            print(f"Warning: Failed to restore item {item.get('item_name')}: {e}")
+            yield {k: v for k, v in item.items() if k != 'id'}
     
-    return restored_count
+    def skip(item, error):
+        print(f"Warning: Failed to restore item {item.get('item_name')}: {error}")
+    
+    db = Database()
+    # A bad item is skipped rather than aborting the restore partway through
+    return len(db.add_items_bulk(valid_items(), on_error=skip))
 
 
 def import_from_csv(csv_path: str) -> tuple[int, int]:
@@ -200,13 +255,10 @@ def import_from_csv(csv_path: str) -> tuple[int, int]:
     Returns:
         Tuple of (success_count, error_count)
     """
-    db = Database()
-    success_count = 0
     error_count = 0
     
-    with open(csv_path, 'r', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
+    def parsed_rows(reader):
+        nonlocal error_count
         for row in reader:
             try:
                 item_data = {
@@ -238,14 +290,24 @@ def import_from_csv(csv_path: str) -> tuple[int, int]:
                     error_count += 1
                     continue
                 
-                db.add_item(item_data)
-                success_count += 1
+                yield item_data
                 
             except Exception as e:
                 print(f"Error importing row: {e}")
                 error_count += 1
     
-    return success_count, error_count
+    def skip(item, error):
+        nonlocal error_count
+        print(f"Error importing row: {error}")
+        error_count += 1
+    
+    db = Database()
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        # Rows stream straight from the file into batched inserts; rows the
+        # database rejects are counted and skipped like unparseable ones
+        item_ids = db.add_items_bulk(parsed_rows(csv.DictReader(csvfile)), on_error=skip)
+    
+    return len(item_ids), error_count
 
 
 if __name__ == "__main__":
@@ -354,7 +354,7 @@ def generate_summary():
     """Print summary statistics"""
     db = Database()
     stats = db.get_summary_stats()
-    items = db.get_all_items()
+    items = db.get_all_items(include_images=True)
     providers = db.get_all_providers()
     
     print("=" * 80)
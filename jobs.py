@@ -0,0 +1,141 @@
+"""
+Background job queue for FlipTrack
+
+Work that does not have to finish inside a request (optimizing uploaded
+images, rendering item reports) is recorded in the jobs table and run by
+a small thread pool. Failed jobs are retried with a growing delay up to
+their max_attempts; the table keeps each job's status and last error so
+pages can show progress and jobs left over from a crash can be resumed.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from database import Database
+
+# Seconds before the first retry; doubles on each further attempt
+RETRY_DELAY = 2.0
+# Running jobs older than this are assumed abandoned by a dead process
+STALE_AFTER = timedelta(minutes=10)
+
+
+def process_item(db: Database, job: Dict):
+    """Optimize an item's uploaded images, then render its report"""
+    from report_generator import ReportGenerator
+    from utils import optimize_image
+    
+    item_id = job['item_id']
+    images = job['payload'].get('images', [])
+    for path in images:
+        # Failures are logged and leave the original file, which the report can still use
+        optimize_image(path)
+    if images:
+        db.refresh_image_metadata(item_id)
+    
+    item = db.get_item(item_id)
+    if item is None:
+        return  # Deleted while queued
+    report_path = ReportGenerator().generate_report(item)
+    db.update_report_path(item_id, report_path)
+
+
+HANDLERS: Dict[str, Callable[[Database, Dict], None]] = {
+    'process_item': process_item,
+}
+
+
+class JobQueue:
+    """Runs jobs from the jobs table on a thread pool, retrying failures"""
+    
+    def __init__(self, db_path: str = "tracker.db", workers: int = 2,
+                 handlers: Dict[str, Callable] = None, retry_delay: float = RETRY_DELAY):
+        self.db_path = db_path
+        self.handlers = dict(HANDLERS if handlers is None else handlers)
+        self.retry_delay = retry_delay
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fliptrack-job")
+        self._timers: List[threading.Timer] = []
+        self._finished = threading.Condition()
+    
+    def submit(self, kind: str, item_id: int = None, max_attempts: int = 3, **payload) -> int:
+        """Queue a job and return its id
+        
+        A job without payload reuses a not-yet-started job of the same
+        kind for the same item, since that one will see the latest data.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind {kind!r}")
+        db = Database(self.db_path)
+        if not payload and item_id is not None:
+            pending = db.find_pending_job(kind, item_id)
+            if pending is not None:
+                return pending
+        job_id = db.add_job(kind, item_id, payload, max_attempts)
+        self._executor.submit(self._run, job_id)
+        return job_id
+    
+    def resume(self) -> int:
+        """Queue jobs left pending, or stuck running, by an earlier process"""
+        db = Database(self.db_path)
+        stale_before = (datetime.now() - STALE_AFTER).isoformat()
+        resumed = 0
+        for job in db.get_unfinished_jobs():
+            if job['status'] == 'running':
+                if (job['started_at'] or '') > stale_before:
+                    continue  # Probably still being worked on elsewhere
+                db.finish_job(job['id'], error="Interrupted", retry=True)
+            self._executor.submit(self._run, job['id'])
+            resumed += 1
+        return resumed
+    
+    def _run(self, job_id: int):
+        db = Database(self.db_path)
+        job = db.start_job(job_id)
+        if job is None:
+            return  # Already taken by another worker
+        try:
+            self.handlers[job['kind']](db, job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Job {job_id} ({job['kind']}) failed on attempt {job['attempts']}: {error}")
+            retry = job['attempts'] < job['max_attempts']
+            db.finish_job(job_id, error=error, retry=retry)
+            if retry:
+                delay = self.retry_delay * 2 ** (job['attempts'] - 1)
+                timer = threading.Timer(delay, self._retry, args=(job_id,))
+                timer.daemon = True
+                self._timers = [t for t in self._timers if t.is_alive()] + [timer]
+                timer.start()
+                return
+        else:
+            db.finish_job(job_id)
+        with self._finished:
+            self._finished.notify_all()
+    
+    def _retry(self, job_id: int):
+        try:
+            self._executor.submit(self._run, job_id)
+        except RuntimeError:
+            pass  # Queue shut down; resume() picks the job up next time
+    
+    def wait(self, job_id: int, timeout: float = None) -> Optional[Dict]:
+        """Block until the job is done or failed (or timeout); returns the job"""
+        db = Database(self.db_path)
+        deadline = None if timeout is None else datetime.now() + timedelta(seconds=timeout)
+        with self._finished:
+            while True:
+                job = db.get_job(job_id)
+                if job is None or job['status'] in ('done', 'failed'):
+                    return job
+                remaining = None if deadline is None else (deadline - datetime.now()).total_seconds()
+                if remaining is not None and remaining <= 0:
+                    return job
+                # Re-check periodically too, for jobs finished by other processes
+                self._finished.wait(0.5 if remaining is None else min(remaining, 0.5))
+    
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; queued retries stay pending for resume()"""
+        for timer in self._timers:
+            timer.cancel()
+        self._executor.shutdown(wait=wait)
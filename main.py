@@ -16,10 +16,11 @@ import subprocess
 import webbrowser
 import time
 
-from database import Database
+from analytics import get_analytics
+from database import Database, ITEM_LIST_COLUMNS
 from scraper import ImageScraper
 from report_generator import ReportGenerator
-from utils import validate_url, validate_price, validate_item_name, optimize_image
+from utils import validate_url, validate_price, validate_item_name, optimize_image, remove_item_files
 from export_utils import export_to_csv, create_full_backup
 
 
@@ -56,13 +57,31 @@ class DashboardScreen(Screen):
         Binding("a", "add_item", "Add"),
         Binding("e", "edit_item", "Edit"),
         Binding("d", "delete_item", "Delete"),
+        Binding("space", "toggle_select", "Select"),
         Binding("p", "providers", "Providers"),
         Binding("t", "analytics", "Analytics"),
         Binding("v", "view_report", "View Report"),
         Binding("ctrl+f", "focus_search", "Search"),
+        Binding("l", "mark_listed", "Mark Listed"),
+        Binding("s", "mark_sold", "Mark Sold"),
+        Binding("n", "next_page", "Next Page"),
+        Binding("b", "prev_page", "Prev Page"),
         Binding("q", "quit", "Quit"),
     ]
     
+    PAGE_SIZE = 100
+    # Seconds between checks for changes made elsewhere (e.g. the web app)
+    CHANGE_POLL_INTERVAL = 2.0
+    
+    def __init__(self):
+        super().__init__()
+        self.page_cursor = None
+        self.next_cursor = None
+        self.prev_cursor = None
+        self.seen_data_version = None
+        # Item ids picked with space; bulk actions apply to these when any
+        self.selected_ids = set()
+    
     def compose(self) -> ComposeResult:
         yield Header()
         yield Container(
@@ -77,7 +96,7 @@ class DashboardScreen(Screen):
             ),
             Static(id="stats-panel"),
             Horizontal(
-                Input(placeholder="Search items...", id="search-input"),
+                Input(placeholder="Search items... (tag:name to filter by tag)", id="search-input"),
                 Select(
                     [("All", "All"), ("Draft", "Draft"), ("Listed", "Listed"), ("Sold", "Sold")],
                     id="status-filter",
@@ -92,18 +111,39 @@ class DashboardScreen(Screen):
     
     def on_mount(self) -> None:
         self.refresh_dashboard()
+        self.set_interval(self.CHANGE_POLL_INTERVAL, self.refresh_if_changed)
+    
+    def refresh_if_changed(self):
+        """Redraw when the database changed since the last refresh"""
+        try:
+            if Database().data_version() != self.seen_data_version:
+                self.refresh_dashboard()
+        except Exception:
+            pass
     
     def on_input_changed(self, event: Input.Changed):
         if event.input.id == "search-input":
+            self.page_cursor = None
             self.refresh_dashboard()
     
     def on_select_changed(self, event: Select.Changed):
         if event.select.id == "status-filter":
+            self.page_cursor = None
             self.refresh_dashboard()
     
     def action_focus_search(self):
         self.query_one("#search-input", Input).focus()
     
+    def action_next_page(self):
+        if self.next_cursor:
+            self.page_cursor = self.next_cursor
+            self.refresh_dashboard()
+    
+    def action_prev_page(self):
+        if self.prev_cursor:
+            self.page_cursor = self.prev_cursor
+            self.refresh_dashboard()
+    
     def on_button_pressed(self, event: Button.Pressed):
         """Handle button clicks in action bar"""
         if event.button.id == "web-app-btn":
@@ -122,17 +162,28 @@ class DashboardScreen(Screen):
     def refresh_dashboard(self):
         try:
             db = Database()
+            self.seen_data_version = db.data_version()
             
             # Get filter values
             search_query = self.query_one("#search-input", Input).value
             status_filter = self.query_one("#status-filter", Select).value
             
-            # Get filtered items
-            items = db.get_all_items(search_query=search_query, status_filter=status_filter)
+            # "tag:foo" words filter by tag; the rest is a text search
+            words = search_query.split()
+            tags = [word[4:] for word in words if word.lower().startswith("tag:")]
+            search_query = " ".join(word for word in words if not word.lower().startswith("tag:"))
+            
+            # Get one page of filtered items
+            page = db.get_items_page(search_query=search_query, status_filter=status_filter,
+                                     cursor=self.page_cursor, page_size=self.PAGE_SIZE,
+                                     tags=tags, tag_mode='all')
+            items = page['items']
+            self.next_cursor = page['next_cursor']
+            self.prev_cursor = page['prev_cursor']
             stats = db.get_summary_stats()
             
             # Update stats panel with enhanced info
-            stats_text = f"""Items: {stats['total_items']} (Draft: {stats['draft_count']}, Listed: {stats['listed_count']}, Sold: {stats['sold_count']}) | Showing: {len(items)}
+            stats_text = f"""Items: {stats['total_items']} (Draft: {stats['draft_count']}, Listed: {stats['listed_count']}, Sold: {stats['sold_count']}) | Showing: {len(items)} of {page['total']}
 Inventory Value: ${stats['inventory_value']:.2f} | Total Invested: ${stats['total_invested']:.2f}
 Potential Profit: ${stats['total_potential_profit']:.2f} | Actual Profit: ${stats['total_actual_profit']:.2f}
 ROI: {stats['roi']:.1f}%"""
@@ -143,7 +194,7 @@ ROI: {stats['roi']:.1f}%"""
             # Update items table
             table = self.query_one("#items-table", DataTable)
             table.clear(columns=True)
-            table.add_columns("ID", "Item Name", "Status", "Purchase", "Target", "Potential Profit")
+            table.add_columns("ID", "Item Name", "Status", "Purchase", "Target", "Potential Profit", "")
             
             for item in items:
                 potential_profit = item['target_price'] - item['purchase_price'] - item['shipping_cost']
@@ -153,7 +204,8 @@ ROI: {stats['roi']:.1f}%"""
                     item['status'],
                     f"${item['purchase_price']:.2f}",
                     f"${item['target_price']:.2f}",
-                    f"${potential_profit:.2f}"
+                    f"${potential_profit:.2f}",
+                    "✓" if item['id'] in self.selected_ids else ""
                 )
             
             if items:
@@ -177,39 +229,78 @@ ROI: {stats['roi']:.1f}%"""
                 self.app.push_screen(ItemFormScreen(mode="edit", item_id=item_id), check_refresh)
     
     def action_delete_item(self):
+        item_ids = self._target_ids()
+        if not item_ids:
+            return
+        if len(item_ids) == 1:
+            table = self.query_one("#items-table", DataTable)
+            if self.selected_ids:
+                prompt = f"Delete item {item_ids[0]}?"
+            else:
+                prompt = f"Delete '{table.get_row_at(table.cursor_row)[1]}'?"
+        else:
+            prompt = f"Delete {len(item_ids)} selected items?"
+        
+        def handle_confirm(confirmed: bool):
+            if confirmed:
+                try:
+                    db = Database()
+                    deleted = db.delete_items(item_ids)
+                    # Images and reports are removed in the background
+                    remove_item_files(deleted, "./data/images")
+                    self.selected_ids.clear()
+                    self.refresh_dashboard()
+                    if len(item_ids) == 1:
+                        self.app.notify(f"Item {item_ids[0]} deleted successfully!")
+                    else:
+                        self.app.notify(f"Deleted {len(deleted)} items")
+                except Exception as e:
+                    self.app.notify(f"Error deleting item: {str(e)}", severity="error")
+        
+        self.app.push_screen(
+            ConfirmDialog(f"{prompt}\nThis cannot be undone.", "Confirm Delete"),
+            handle_confirm
+        )
+    
+    def action_toggle_select(self):
+        """Add or remove the highlighted item from the multi-selection"""
         table = self.query_one("#items-table", DataTable)
-        if table.row_count > 0:
-            row_key = table.cursor_row
-            if row_key is not None:
-                item_id = int(table.get_row_at(row_key)[0])
-                item_name = table.get_row_at(row_key)[1]
-                
-                def handle_confirm(confirmed: bool):
-                    if confirmed:
-                        try:
-                            db = Database()
-                            
-                            # Get item to delete images
-                            item = db.get_item(item_id)
-                            
-                            # Delete from database
-                            db.delete_item(item_id)
-                            
-                            # Delete images directory
-                            if item:
-                                item_dir = Path(f"./data/images/item_{item_id}")
-                                if item_dir.exists():
-                                    shutil.rmtree(item_dir)
-                            
-                            self.refresh_dashboard()
-                            self.app.notify(f"Item {item_id} deleted successfully!")
-                        except Exception as e:
-                            self.app.notify(f"Error deleting item: {str(e)}", severity="error")
-                
-                self.app.push_screen(
-                    ConfirmDialog(f"Delete '{item_name}'?\nThis cannot be undone.", "Confirm Delete"),
-                    handle_confirm
-                )
+        if table.row_count > 0 and table.cursor_row is not None:
+            row = table.cursor_row
+            item_id = int(table.get_row_at(row)[0])
+            self.selected_ids ^= {item_id}
+            table.update_cell_at((row, 6), "✓" if item_id in self.selected_ids else "")
+            table.move_cursor(row=row + 1)
+    
+    def _target_ids(self) -> list:
+        """Selected item ids, or the highlighted item when nothing is selected"""
+        if self.selected_ids:
+            return sorted(self.selected_ids)
+        table = self.query_one("#items-table", DataTable)
+        if table.row_count > 0 and table.cursor_row is not None:
+            return [int(table.get_row_at(table.cursor_row)[0])]
+        return []
+    
+    def _set_selected_status(self, status: str):
+        item_ids = self._target_ids()
+        if item_ids:
+            try:
+                db = Database()
+                updated = db.bulk_update_status(item_ids, status)
+                self.selected_ids.clear()
+                self.refresh_dashboard()
+                if len(item_ids) == 1:
+                    self.app.notify(f"Item {item_ids[0]} marked {status}")
+                else:
+                    self.app.notify(f"{updated} items marked {status}")
+            except Exception as e:
+                self.app.notify(f"Error updating status: {str(e)}", severity="error")
+    
+    def action_mark_listed(self):
+        self._set_selected_status("Listed")
+    
+    def action_mark_sold(self):
+        self._set_selected_status("Sold")
     
     def action_view_report(self):
         """View the HTML report for the selected item"""
@@ -249,12 +340,11 @@ ROI: {stats['roi']:.1f}%"""
     def action_master_index(self):
         try:
             db = Database()
-            items = db.get_all_items()
             generator = ReportGenerator()
             
             # Generate missing reports first
-            self.app.notify(f"Generating reports for {len(items)} items...")
-            for item in items:
+            self.app.notify(f"Generating reports for {db.get_summary_stats()['total_items']} items...")
+            for item in db.iter_items(include_images=True):
                 if not item.get('report_path') or not os.path.exists(item.get('report_path', '')):
                     try:
                         report_path = generator.generate_report(item)
@@ -262,9 +352,8 @@ ROI: {stats['roi']:.1f}%"""
                     except Exception as e:
                         print(f"Failed to generate report for item {item['id']}: {e}")
             
-            # Generate master index
-            items = db.get_all_items()  # Refresh to get updated report paths
-            index_path = generator.generate_master_index(items)
+            # Generate master index (re-read to pick up the new report paths)
+            index_path = generator.generate_master_index(db.iter_items(columns=ITEM_LIST_COLUMNS))
             
             # Automatically open the index
             try:
@@ -286,7 +375,7 @@ ROI: {stats['roi']:.1f}%"""
         """Generate reports for all items"""
         try:
             db = Database()
-            items = db.get_all_items()
+            items = db.get_all_items(include_images=True)
             
             if not items:
                 self.app.notify("No items to generate reports for", severity="warning")
@@ -376,39 +465,21 @@ ROI: {stats['roi']:.1f}%"""
     def action_delete_all(self):
         """Delete all items from database"""
         db = Database()
-        items = db.get_all_items()
+        item_count = db.get_summary_stats(include_archive=True)['total_items']
         
-        if not items:
+        if not item_count:
             self.app.notify("No items to delete", severity="warning")
             return
         
-        item_count = len(items)
-        
         def handle_confirm(confirmed: bool):
             if confirmed:
                 try:
                     db = Database()
-                    items = db.get_all_items()
+                    item_ids = [item['id'] for item in db.iter_items(columns=['id'], include_archive=True)]
                     
-                    deleted_count = 0
-                    error_count = 0
-                    
-                    for item in items:
-                        try:
-                            item_id = item['id']
-                            
-                            # Delete from database
-                            db.delete_item(item_id)
-                            
-                            # Delete images directory
-                            item_dir = Path(f"./data/images/item_{item_id}")
-                            if item_dir.exists():
-                                shutil.rmtree(item_dir)
-                            
-                            deleted_count += 1
-                        except Exception as e:
-                            error_count += 1
-                            print(f"Failed to delete item {item_id}: {e}")
+                    # One transaction for the records; files go in the background
+                    deleted = db.delete_items(item_ids)
+                    remove_item_files(deleted, "./data/images")
                     
                     # Clear reports directory
                     try:
@@ -419,12 +490,9 @@ ROI: {stats['roi']:.1f}%"""
                     except Exception as e:
                         print(f"Failed to clear reports: {e}")
                     
+                    self.selected_ids.clear()
                     self.refresh_dashboard()
-                    
-                    if error_count > 0:
-                        self.app.notify(f"Deleted {deleted_count} items ({error_count} errors)", severity="warning")
-                    else:
-                        self.app.notify(f"Deleted all {deleted_count} items")
+                    self.app.notify(f"Deleted all {len(deleted)} items")
                         
                 except Exception as e:
                     self.app.notify(f"Error deleting items: {str(e)}", severity="error")
@@ -1103,15 +1171,17 @@ class ProvidersScreen(Screen):
             table.clear(columns=True)
             table.add_columns("ID", "Name", "Contact", "Phone", "Email", "Items")
             
+            item_counts = {
+                ps['provider']['id']: ps['stats']['total_items'] for ps in db.get_all_provider_stats()
+            }
             for provider in providers:
-                items = db.get_provider_items(provider['id'])
                 table.add_row(
                     str(provider['id']),
                     provider['name'][:30],
                     provider.get('contact_person', '')[:20],
                     provider.get('phone', '')[:15],
                     provider.get('email', '')[:25],
-                    str(len(items))
+                    str(item_counts.get(provider['id'], 0))
                 )
             
             if providers:
@@ -1402,8 +1472,8 @@ class AnalyticsScreen(Screen):
     def refresh_analytics(self):
         try:
             db = Database()
-            items = db.get_all_items()
-            stats = db.get_summary_stats()
+            # Lifetime figures, archived sales included
+            stats = db.get_summary_stats(include_archive=True)
             
             # Summary
             summary_text = f"""Total Items: {stats['total_items']}
@@ -1422,27 +1492,12 @@ ROI: {stats['roi']:.1f}%"""
             current_year = datetime.now().year
             
             # Calculate quarterly
-            quarters = {1: [], 2: [], 3: [], 4: []}
-            for item in items:
-                if item['status'] == 'Sold' and item.get('date_sold'):
-                    try:
-                        date_sold = datetime.fromisoformat(item['date_sold'])
-                        if date_sold.year == current_year:
-                            quarter = (date_sold.month - 1) // 3 + 1
-                            total_expenses = (
-                                item['purchase_price'] + item['shipping_cost'] +
-                                item.get('listing_fee', 0) + item.get('processing_fee', 0) +
-                                item.get('storage_cost', 0) + item.get('other_expenses', 0)
-                            )
-                            profit = item['final_sold_price'] - total_expenses
-                            quarters[quarter].append(profit)
-                    except:
-                        pass
+            report = get_analytics(db, include_archive=True)
+            quarters = report.quarterly_profit(current_year)
             
             tax_text = f"Year: {current_year}\n\n"
             for q in range(1, 5):
-                q_profit = sum(quarters[q])
-                tax_text += f"Q{q}: ${q_profit:.2f} ({len(quarters[q])} items)\n"
+                tax_text += f"Q{q}: ${quarters[q]['profit']:.2f} ({quarters[q]['count']} items)\n"
             tax_text += f"\nAnnual Profit: ${stats['total_actual_profit']:.2f}"
             
             self.query_one("#tax-report", Static).update(
@@ -1450,22 +1505,10 @@ ROI: {stats['roi']:.1f}%"""
             )
             
             # Sales Channel Breakdown
-            channels = {}
-            for item in items:
-                if item['status'] == 'Sold' and item.get('sales_channel'):
-                    channel = item['sales_channel']
-                    if channel not in channels:
-                        channels[channel] = {'count': 0, 'revenue': 0, 'profit': 0}
-                    
-                    channels[channel]['count'] += 1
-                    channels[channel]['revenue'] += item['final_sold_price']
-                    
-                    total_expenses = (
-                        item['purchase_price'] + item['shipping_cost'] +
-                        item.get('listing_fee', 0) + item.get('processing_fee', 0) +
-                        item.get('storage_cost', 0) + item.get('other_expenses', 0)
-                    )
-                    channels[channel]['profit'] += item['final_sold_price'] - total_expenses
+            channels = {
+                group['key']: {'count': group['sold'], 'revenue': group['revenue'], 'profit': group['profit']}
+                for group in report.channels
+            }
             
             channel_text = ""
             for channel, data in sorted(channels.items(), key=lambda x: x[1]['profit'], reverse=True):
@@ -1479,12 +1522,11 @@ ROI: {stats['roi']:.1f}%"""
             )
             
             # Provider Breakdown
-            providers = db.get_all_providers()
             provider_text = ""
             
-            for provider in providers[:10]:  # Top 10
-                provider_stats = db.get_provider_stats(provider['id'])
-                provider_text += f"{provider['name']}: {provider_stats['total_items']} items | ${provider_stats['total_actual_profit']:.2f} profit\n"
+            for ps in db.get_all_provider_stats()[:10]:  # Top 10 by actual profit
+                provider_stats = ps['stats']
+                provider_text += f"{ps['provider']['name']}: {provider_stats['total_items']} items | ${provider_stats['total_actual_profit']:.2f} profit\n"
             
             if not provider_text:
                 provider_text = "No providers yet"
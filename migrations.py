@@ -0,0 +1,564 @@
+"""
+Schema migrations for FlipTrack
+
+Each migration upgrades the database schema by one version. The version a
+database file is at is stored in SQLite's PRAGMA user_version, so every
+migration runs exactly once per file and later startups only read the header.
+"""
+
+import re
+import sqlite3
+from typing import Callable, List, Tuple
+
+# Generated columns (v4) need 3.31; v8 rebuilds items instead of DROP COLUMN (3.35)
+MIN_SQLITE_VERSION = (3, 31, 0)
+
+
+def _drop_columns(conn: sqlite3.Connection, table: str, columns: Tuple[str, ...]):
+    """Drop columns by rebuilding the table, for SQLite builds without DROP COLUMN
+    
+    Follows SQLite's documented procedure: create the new table, copy the
+    rows, drop the old one, rename, then recreate its indexes and triggers.
+    The AUTOINCREMENT sequence is carried over so deleted ids aren't reused.
+    """
+    create_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    # Columns are never first (id is), so each definition starts with a comma
+    for column in columns:
+        create_sql, found = re.subn(rf',\s*"?{column}"?\s+TEXT\b[^,)]*', '', create_sql, count=1)
+        if not found:
+            raise ValueError(f"Column {column} not found in {table} schema")
+    create_sql = re.sub(rf'^CREATE TABLE\s+(IF NOT EXISTS\s+)?"?{table}"?', f'CREATE TABLE {table}_new',
+                        create_sql, count=1, flags=re.IGNORECASE)
+    
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL", (table,)
+    )]
+    sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    # Hidden (generated) columns are recomputed, not copied
+    kept = [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")
+            if row[6] == 0 and row[1] not in columns]
+    
+    conn.execute(create_sql)
+    conn.execute(f"INSERT INTO {table}_new ({', '.join(kept)}) SELECT {', '.join(kept)} FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+    for sql in dependents:
+        conn.execute(sql)
+    if sequence is not None:
+        conn.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (sequence[0], table))
+
+
+def _v1_initial_schema(conn: sqlite3.Connection):
+    """Items and providers tables (matches databases created before versioning)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_name TEXT NOT NULL,
+            purchase_price REAL NOT NULL,
+            shipping_cost REAL NOT NULL,
+            target_price REAL NOT NULL,
+            product_url TEXT,
+            status TEXT DEFAULT 'Draft',
+            final_sold_price REAL,
+            report_path TEXT,
+            image_urls_cache TEXT,
+            category TEXT,
+            selected_images TEXT,
+            provider_id INTEGER,
+            listing_fee REAL DEFAULT 0,
+            processing_fee REAL DEFAULT 0,
+            storage_cost REAL DEFAULT 0,
+            other_expenses REAL DEFAULT 0,
+            sales_channel TEXT,
+            listing_url TEXT,
+            date_added TEXT,
+            date_listed TEXT,
+            date_sold TEXT,
+            notes TEXT,
+            tags TEXT,
+            condition TEXT,
+            storage_location TEXT
+        )
+    """)
+    
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS providers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact_person TEXT,
+            phone TEXT,
+            email TEXT,
+            website TEXT,
+            notes TEXT,
+            tags TEXT
+        )
+    """)
+
+
+def _v2_secondary_indexes(conn: sqlite3.Connection):
+    """Indexes for the status/provider filters, analytics grouping and listing order"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_provider_id ON items(provider_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_date_sold ON items(date_sold)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_sales_channel ON items(sales_channel)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_category ON items(category)")
+    # Also serves plain status lookups, so there is no separate status index
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_status_id ON items(status, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_providers_name ON providers(name)")
+    conn.execute("ANALYZE")
+
+
+def _v3_full_text_search(conn: sqlite3.Connection):
+    """FTS5 indexes over item and provider text, kept in sync by triggers
+    
+    Skipped when the SQLite build lacks FTS5; searches then fall back to LIKE.
+    """
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                item_name, tags, notes,
+                content='items', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e):
+            return
+        raise
+    
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS providers_fts USING fts5(
+            name, tags,
+            content='providers', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+    
+    triggers = [
+        """CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts(rowid, item_name, tags, notes)
+            VALUES (new.id, new.item_name, new.tags, new.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, item_name, tags, notes)
+            VALUES ('delete', old.id, old.item_name, old.tags, old.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE OF item_name, tags, notes ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, item_name, tags, notes)
+            VALUES ('delete', old.id, old.item_name, old.tags, old.notes);
+            INSERT INTO items_fts(rowid, item_name, tags, notes)
+            VALUES (new.id, new.item_name, new.tags, new.notes);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS providers_fts_insert AFTER INSERT ON providers BEGIN
+            INSERT INTO providers_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS providers_fts_delete AFTER DELETE ON providers BEGIN
+            INSERT INTO providers_fts(providers_fts, rowid, name, tags)
+            VALUES ('delete', old.id, old.name, old.tags);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS providers_fts_update AFTER UPDATE OF name, tags ON providers BEGIN
+            INSERT INTO providers_fts(providers_fts, rowid, name, tags)
+            VALUES ('delete', old.id, old.name, old.tags);
+            INSERT INTO providers_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+        END""",
+    ]
+    # executescript() would commit the migration transaction, so run one by one
+    for trigger in triggers:
+        conn.execute(trigger)
+    
+    # Index rows that existed before this migration
+    conn.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO providers_fts(providers_fts) VALUES ('rebuild')")
+
+
+def _v4_profit_columns(conn: sqlite3.Connection):
+    """Generated expense/profit columns so filters and sorts run in SQL
+    
+    SQLite can only ALTER in VIRTUAL generated columns; indexing them stores
+    the computed values in the index, which is what the filters need.
+    """
+    conn.execute("""
+        ALTER TABLE items ADD COLUMN total_expenses REAL GENERATED ALWAYS AS (
+            purchase_price + shipping_cost + COALESCE(listing_fee, 0) + COALESCE(processing_fee, 0)
+            + COALESCE(storage_cost, 0) + COALESCE(other_expenses, 0)
+        ) VIRTUAL
+    """)
+    conn.execute("""
+        ALTER TABLE items ADD COLUMN potential_profit REAL GENERATED ALWAYS AS (
+            target_price - total_expenses
+        ) VIRTUAL
+    """)
+    conn.execute("""
+        ALTER TABLE items ADD COLUMN actual_profit REAL GENERATED ALWAYS AS (
+            CASE WHEN status = 'Sold' AND final_sold_price IS NOT NULL
+                 THEN final_sold_price - total_expenses END
+        ) VIRTUAL
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_potential_profit ON items(potential_profit)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_actual_profit ON items(actual_profit)")
+
+
+def _v5_sort_indexes(conn: sqlite3.Connection):
+    """Indexes backing keyset pagination on name and purchase price"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_item_name ON items(item_name)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_purchase_price ON items(purchase_price)")
+
+
+def _v6_item_version(conn: sqlite3.Connection):
+    """Row version counter for optimistic concurrency in patch_item"""
+    conn.execute("ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+
+def _v7_tag_tables(conn: sqlite3.Connection):
+    """Normalized item/provider tag tables, backfilled from the tags columns
+    
+    The comma-separated tags columns stay the source shown in forms; these
+    tables hold one lowercased row per tag so tag filters use an index.
+    """
+    for table, owner, owner_column in (('item_tags', 'items', 'item_id'),
+                                       ('provider_tags', 'providers', 'provider_id')):
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {owner_column} INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (tag, {owner_column})
+            ) WITHOUT ROWID
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{owner_column} ON {table}({owner_column})")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {owner}_tags_ad AFTER DELETE ON {owner} BEGIN
+                DELETE FROM {table} WHERE {owner_column} = old.id;
+            END
+        """)
+        # Split each comma-separated tags value into one row per tag
+        conn.execute(f"""
+            WITH RECURSIVE split(owner_id, tag, rest) AS (
+                SELECT id, '', COALESCE(tags, '') || ',' FROM {owner}
+                UNION ALL
+                SELECT owner_id, substr(rest, 1, instr(rest, ',') - 1),
+                       substr(rest, instr(rest, ',') + 1)
+                FROM split WHERE rest != ''
+            )
+            INSERT OR IGNORE INTO {table} ({owner_column}, tag)
+            SELECT owner_id, lower(trim(tag)) FROM split WHERE trim(tag) != ''
+        """)
+
+
+def _v8_item_images(conn: sqlite3.Connection):
+    """Move the JSON image lists on items into an item_images table
+    
+    role is 'selected' for saved image files and 'source' for scraped image
+    URLs. File metadata starts out NULL for migrated rows; see
+    Database.backfill_image_metadata.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS item_images (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            size_bytes INTEGER,
+            width INTEGER,
+            height INTEGER,
+            content_hash TEXT,
+            UNIQUE (item_id, role, ordinal)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_item_images_content_hash ON item_images(content_hash)")
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS items_images_ad AFTER DELETE ON items BEGIN
+            DELETE FROM item_images WHERE item_id = old.id;
+        END
+    """)
+    for column, role in (('selected_images', 'selected'), ('image_urls_cache', 'source')):
+        conn.execute(f"""
+            INSERT INTO item_images (item_id, role, ordinal, path)
+            SELECT items.id, '{role}', images.key, images.value
+            FROM items, json_each(items.{column}) AS images
+            WHERE json_valid(items.{column}) AND json_type(items.{column}) = 'array'
+              AND images.type = 'text'
+        """)
+    _drop_columns(conn, 'items', ('selected_images', 'image_urls_cache'))
+
+
+# stats_rollup scopes and the key each item row falls under ({r} is new/old/items)
+ROLLUP_SCOPES = [
+    ('global', "''"),
+    ('status', "COALESCE({r}.status, '')"),
+    ('channel', "COALESCE({r}.sales_channel, '')"),
+    ('provider', "COALESCE(CAST({r}.provider_id AS TEXT), '')"),
+    ('category', "COALESCE({r}.category, '')"),
+]
+
+# stats_rollup measure columns and each item row's contribution
+ROLLUP_MEASURES = [
+    ('item_count', "1"),
+    ('draft_count', "CASE WHEN {r}.status = 'Draft' THEN 1 ELSE 0 END"),
+    ('listed_count', "CASE WHEN {r}.status = 'Listed' THEN 1 ELSE 0 END"),
+    ('sold_count', "CASE WHEN {r}.status = 'Sold' THEN 1 ELSE 0 END"),
+    ('total_invested', "COALESCE({r}.total_expenses, 0)"),
+    ('inventory_value', "CASE WHEN {r}.status IS NOT 'Sold' THEN COALESCE({r}.total_expenses, 0) ELSE 0 END"),
+    ('potential_profit', "CASE WHEN {r}.status IS NOT 'Sold' THEN COALESCE({r}.potential_profit, 0) ELSE 0 END"),
+    ('actual_profit', "COALESCE({r}.actual_profit, 0)"),
+    ('revenue', "CASE WHEN {r}.status = 'Sold' THEN COALESCE({r}.final_sold_price, 0) ELSE 0 END"),
+]
+
+# Item columns the rollup depends on; other updates skip the rollup trigger
+ROLLUP_ITEM_COLUMNS = [
+    'status', 'sales_channel', 'provider_id', 'category', 'purchase_price', 'shipping_cost',
+    'target_price', 'final_sold_price', 'listing_fee', 'processing_fee', 'storage_cost',
+    'other_expenses',
+]
+
+
+def _rollup_upserts(row: str, sign: str) -> str:
+    """Trigger statements adding (sign '') or removing (sign '-') one row's totals"""
+    columns = ', '.join(name for name, _ in ROLLUP_MEASURES)
+    statements = []
+    for scope, key in ROLLUP_SCOPES:
+        values = ', '.join(f"{sign}({expr.format(r=row)})" for _, expr in ROLLUP_MEASURES)
+        updates = ', '.join(f"{name} = {name} + excluded.{name}" for name, _ in ROLLUP_MEASURES)
+        statements.append(
+            f"INSERT INTO stats_rollup (scope, key, {columns}) "
+            f"VALUES ('{scope}', {key.format(r=row)}, {values}) "
+            f"ON CONFLICT (scope, key) DO UPDATE SET {updates};"
+        )
+    return "\n".join(statements)
+
+
+def rebuild_stats_rollup(conn: sqlite3.Connection):
+    """Recompute every stats_rollup row from the items table"""
+    conn.execute("DELETE FROM stats_rollup")
+    columns = ', '.join(name for name, _ in ROLLUP_MEASURES)
+    sums = ', '.join(f"TOTAL({expr.format(r='items')})" for _, expr in ROLLUP_MEASURES)
+    for scope, key in ROLLUP_SCOPES:
+        conn.execute(f"""
+            INSERT INTO stats_rollup (scope, key, {columns})
+            SELECT '{scope}', {key.format(r='items')}, {sums}
+            FROM items GROUP BY 2
+        """)
+
+
+def _v9_stats_rollup(conn: sqlite3.Connection):
+    """Trigger-maintained dashboard totals per scope
+    
+    Counts are stored as REAL sums; callers convert them back to int.
+    """
+    measure_columns = ', '.join(f"{name} REAL NOT NULL DEFAULT 0" for name, _ in ROLLUP_MEASURES)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS stats_rollup (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            {measure_columns},
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    """)
+    cleanup = "DELETE FROM stats_rollup WHERE item_count = 0;"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_rollup_ai AFTER INSERT ON items BEGIN
+            {_rollup_upserts('new', '')}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_rollup_ad AFTER DELETE ON items BEGIN
+            {_rollup_upserts('old', '-')}
+            {cleanup}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS items_rollup_au
+        AFTER UPDATE OF {', '.join(ROLLUP_ITEM_COLUMNS)} ON items BEGIN
+            {_rollup_upserts('old', '-')}
+            {_rollup_upserts('new', '')}
+            {cleanup}
+        END
+    """)
+    rebuild_stats_rollup(conn)
+
+
+# Trigger body bumping the global change counter that caches key on
+_CHANGE_BUMP = "UPDATE change_counter SET version = version + 1 WHERE id = 1;"
+
+
+def _change_triggers(conn: sqlite3.Connection, table: str):
+    """Bump change_counter on every insert, update and delete of table"""
+    for event, suffix in (('INSERT', 'ai'), ('UPDATE', 'au'), ('DELETE', 'ad')):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_changes_{suffix} AFTER {event} ON {table} BEGIN
+                {_CHANGE_BUMP}
+            END
+        """)
+
+
+def _v10_change_tracking(conn: sqlite3.Connection):
+    """updated_at on items/providers and a global change counter
+    
+    Writers that set updated_at themselves are left alone; any other update
+    gets it stamped by trigger. Every insert, update and delete of an item
+    or provider bumps change_counter.version, which caches key on.
+    """
+    conn.execute("ALTER TABLE items ADD COLUMN updated_at TEXT")
+    conn.execute("ALTER TABLE providers ADD COLUMN updated_at TEXT")
+    conn.execute("UPDATE items SET updated_at = COALESCE(date_added, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))")
+    conn.execute("UPDATE providers SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_counter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO change_counter (id, version) VALUES (1, 0)")
+    
+    for table in ('items', 'providers'):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_touch_au AFTER UPDATE ON {table}
+            WHEN new.updated_at IS old.updated_at BEGIN
+                UPDATE {table} SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime') WHERE id = new.id;
+            END
+        """)
+        _change_triggers(conn, table)
+
+
+def _v11_items_archive(conn: sqlite3.Connection):
+    """items_archive holds sold items moved out of the live items table
+    
+    Archived rows keep their id, tags and images; only the live-table
+    indexes, full-text index and stats rollup drop them.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS items_archive (
+            id INTEGER PRIMARY KEY,
+            item_name TEXT NOT NULL,
+            purchase_price REAL NOT NULL,
+            shipping_cost REAL NOT NULL,
+            target_price REAL NOT NULL,
+            product_url TEXT,
+            status TEXT DEFAULT 'Draft',
+            final_sold_price REAL,
+            report_path TEXT,
+            category TEXT,
+            provider_id INTEGER,
+            listing_fee REAL DEFAULT 0,
+            processing_fee REAL DEFAULT 0,
+            storage_cost REAL DEFAULT 0,
+            other_expenses REAL DEFAULT 0,
+            sales_channel TEXT,
+            listing_url TEXT,
+            date_added TEXT,
+            date_listed TEXT,
+            date_sold TEXT,
+            notes TEXT,
+            tags TEXT,
+            condition TEXT,
+            storage_location TEXT,
+            total_expenses REAL GENERATED ALWAYS AS (
+                purchase_price + shipping_cost + COALESCE(listing_fee, 0) + COALESCE(processing_fee, 0)
+                + COALESCE(storage_cost, 0) + COALESCE(other_expenses, 0)
+            ) VIRTUAL,
+            potential_profit REAL GENERATED ALWAYS AS (target_price - total_expenses) VIRTUAL,
+            actual_profit REAL GENERATED ALWAYS AS (
+                CASE WHEN status = 'Sold' AND final_sold_price IS NOT NULL
+                     THEN final_sold_price - total_expenses END
+            ) VIRTUAL,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT,
+            archived_at TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_archive_date_sold ON items_archive(date_sold)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_items_archive_provider_id ON items_archive(provider_id)")
+    
+    # Moving a row to the archive deletes it from items; keep its tags and images
+    for trigger, table in (('items_tags_ad', 'item_tags'), ('items_images_ad', 'item_images')):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(f"""
+            CREATE TRIGGER {trigger} AFTER DELETE ON items
+            WHEN NOT EXISTS (SELECT 1 FROM items_archive WHERE id = old.id) BEGIN
+                DELETE FROM {table} WHERE item_id = old.id;
+            END
+        """)
+
+
+def _v12_jobs(conn: sqlite3.Connection):
+    """jobs records background work (image optimization, report rendering) for retries and status"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            item_id INTEGER,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_item_id ON jobs(item_id, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+
+def _v13_archive_change_tracking(conn: sqlite3.Connection):
+    """Archive writes bump change_counter too, so lifetime figures don't go stale"""
+    _change_triggers(conn, 'items_archive')
+
+
+# (version, description, upgrade function) - append new migrations at the end
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Initial items and providers tables", _v1_initial_schema),
+    (2, "Secondary indexes on items and providers", _v2_secondary_indexes),
+    (3, "Full-text search for items and providers", _v3_full_text_search),
+    (4, "Generated expense and profit columns", _v4_profit_columns),
+    (5, "Indexes for sorted item pages", _v5_sort_indexes),
+    (6, "Item version column", _v6_item_version),
+    (7, "Normalized item and provider tags", _v7_tag_tables),
+    (8, "Item images table", _v8_item_images),
+    (9, "Stats rollup table", _v9_stats_rollup),
+    (10, "updated_at columns and change counter", _v10_change_tracking),
+    (11, "Archive table for sold items", _v11_items_archive),
+    (12, "Background jobs table", _v12_jobs),
+    (13, "Change tracking for archived items", _v13_archive_change_tracking),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version
+    
+    Each migration runs in its own IMMEDIATE transaction, and the version is
+    re-read after taking the write lock so concurrent processes starting at
+    the same time do not apply the same migration twice.
+    """
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise Exception(
+            f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required "
+            f"(this Python uses {sqlite3.sqlite_version})"
+        )
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return get_schema_version(conn)
+    
+    for version, description, upgrade in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            upgrade(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Migration {version} ({description}) failed: {str(e)}")
+    
+    return get_schema_version(conn)
@@ -0,0 +1,115 @@
+"""Compact read-only records for item and provider rows
+
+Records wrap the sqlite3.Row a query returned instead of copying it into a
+dict, so a listing holds one small object per row. They behave like a
+read-only mapping (item['status'], item.get(...), dict(item)) and also
+expose columns as attributes, which is what templates use.
+"""
+import sqlite3
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+
+class Record(Mapping):
+    """Mapping view over one sqlite3.Row, plus any values set afterwards"""
+
+    __slots__ = ('_row', '_extra')
+
+    # Keys served by properties when the query did not select them
+    _computed = ()
+
+    def __init__(self, row: sqlite3.Row):
+        self._row = row
+        self._extra: Optional[Dict[str, Any]] = None
+
+    def _column(self, key: str):
+        """Selected column value, or KeyError if it was not selected"""
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        try:
+            return self._row[key]
+        except (IndexError, KeyError):
+            raise KeyError(key) from None
+
+    def __getitem__(self, key: str):
+        try:
+            return self._column(key)
+        except KeyError:
+            if key in self._computed:
+                return getattr(self, key)
+            raise
+
+    def __setitem__(self, key: str, value):
+        # Values attached after the query (e.g. image lists) live beside the row
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        yield from self._row.keys()
+        if self._extra:
+            row_keys = set(self._row.keys())
+            yield from (key for key in self._extra if key not in row_keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __contains__(self, key) -> bool:
+        try:
+            self._column(key)
+            return True
+        except KeyError:
+            return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy, e.g. for JSON output"""
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Item(Record):
+    """An items row; profit columns are computed if the query skipped them"""
+
+    __slots__ = ()
+    _computed = ('total_expenses', 'potential_profit', 'actual_profit')
+
+    @property
+    def total_expenses(self) -> float:
+        try:
+            return self._column('total_expenses')
+        except KeyError:
+            return (self._column('purchase_price') + self._column('shipping_cost')
+                    + (self.get('listing_fee') or 0) + (self.get('processing_fee') or 0)
+                    + (self.get('storage_cost') or 0) + (self.get('other_expenses') or 0))
+
+    @property
+    def potential_profit(self) -> float:
+        try:
+            return self._column('potential_profit')
+        except KeyError:
+            return self._column('target_price') - self.total_expenses
+
+    @property
+    def actual_profit(self) -> Optional[float]:
+        try:
+            return self._column('actual_profit')
+        except KeyError:
+            if self._column('status') == 'Sold' and self.get('final_sold_price') is not None:
+                return self._column('final_sold_price') - self.total_expenses
+            return None
+
+
+class Provider(Record):
+    """A providers row"""
+
+    __slots__ = ()
@@ -0,0 +1,408 @@
+"""
+Opt-in query profiling for FlipTrack
+
+When profiling is enabled (enable(), or FLIPTRACK_PROFILE_QUERIES=1 in the
+environment), connections opened by Database time every statement and
+every get_connection() block. The profiler keeps call counts, total and
+p50/p95/p99 durations and rows per Database method and per statement, and
+logs statements slower than the threshold with their parameter shape and
+EXPLAIN QUERY PLAN output.
+
+Connections opened before enable() are not profiled; Database.close_all()
+makes the pools reopen them.
+
+Run `python query_profiler.py report [db_path]` for a report over the
+common Database calls, with the query plan of every statement they ran.
+"""
+
+import contextlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+logger = logging.getLogger('fliptrack.queries')
+
+DEFAULT_SLOW_MS = 100.0
+# Durations kept per method/statement for the percentiles
+MAX_SAMPLES = 10000
+# Frames skipped when finding the method that ran a query
+_PLUMBING_FILES = {__file__, contextlib.__file__}
+_PLUMBING_NAMES = {'get_connection', 'transaction', 'reader', 'acquire'}
+
+
+def _caller() -> str:
+    """Qualified name of the innermost function outside the connection plumbing"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename not in _PLUMBING_FILES and code.co_name not in _PLUMBING_NAMES:
+            return getattr(code, 'co_qualname', code.co_name)
+        frame = frame.f_back
+    return '?'
+
+
+def normalize_sql(sql: str) -> str:
+    """Statement text with whitespace collapsed and IN (?, ?, ...) lists folded"""
+    sql = ' '.join(sql.split())
+    return re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', sql)
+
+
+def params_shape(params) -> str:
+    """Parameter count and types, without the values"""
+    if not params:
+        return 'no params'
+    if isinstance(params, dict):
+        return ', '.join(f":{name} {type(value).__name__}" for name, value in params.items())
+    types = [type(value).__name__ for value in params]
+    shown = ', '.join(types[:8]) + (', ...' if len(types) > 8 else '')
+    return f"{len(types)} params ({shown})"
+
+
+def explain(conn: sqlite3.Connection, sql: str, params=()) -> List[str]:
+    """EXPLAIN QUERY PLAN output as indented lines (empty if it cannot be explained)"""
+    try:
+        rows = sqlite3.Connection.execute(conn, f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error:
+        return []
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in (tuple(row) for row in rows):
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+class _Timing:
+    """Running totals plus recent samples for one method or statement"""
+    
+    __slots__ = ('calls', 'total', 'rows', 'samples', 'example')
+    
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.rows = 0
+        # [seconds] per call; statement samples keep growing while rows are fetched
+        self.samples = deque(maxlen=MAX_SAMPLES)
+        self.example = None
+    
+    def to_dict(self) -> Dict:
+        ordered = sorted(sample[0] for sample in self.samples)
+        stats = {'calls': self.calls, 'total_ms': self.total * 1000, 'rows': self.rows}
+        for percent in (50, 95, 99):
+            stats[f'p{percent}_ms'] = _percentile(ordered, percent) * 1000 if ordered else 0.0
+        return stats
+
+
+class QueryProfiler:
+    """Collects timings from profiled connections"""
+    
+    def __init__(self, slow_ms: float = DEFAULT_SLOW_MS):
+        self.slow_ms = slow_ms
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+    
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._methods: Dict[str, _Timing] = {}
+            self._statements: Dict[tuple, _Timing] = {}
+            self.slow_queries = deque(maxlen=100)
+    
+    def _timing(self, table: Dict, key) -> _Timing:
+        timing = table.get(key)
+        if timing is None:
+            timing = table.setdefault(key, _Timing())
+        return timing
+    
+    @contextlib.contextmanager
+    def block(self):
+        """Time an outermost get_connection() block against its calling method"""
+        if getattr(self._local, 'block', None) is not None:
+            yield
+            return
+        method = _caller()
+        block = self._local.block = [0]  # rows
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.block = None
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                timing = self._timing(self._methods, method)
+                timing.calls += 1
+                timing.total += elapsed
+                timing.rows += block[0]
+                timing.samples.append([elapsed])
+    
+    def _start(self, sql: str, params, elapsed: float, rows: int) -> tuple:
+        """Record one statement execution; returns its sample for later fetches"""
+        key = (_caller(), normalize_sql(sql))
+        sample = [elapsed]
+        with self._lock:
+            timing = self._timing(self._statements, key)
+            timing.calls += 1
+            timing.total += elapsed
+            timing.rows += rows
+            timing.samples.append(sample)
+            timing.example = (sql, params)
+        self._count_rows(rows)
+        return sample, timing
+    
+    def _add(self, sample: list, timing: _Timing, elapsed: float, rows: int):
+        """Add fetch time and rows to an execution recorded by _start"""
+        with self._lock:
+            sample[0] += elapsed
+            timing.total += elapsed
+            timing.rows += rows
+        self._count_rows(rows)
+    
+    def _count_rows(self, rows: int):
+        block = getattr(self._local, 'block', None)
+        if block is not None:
+            block[0] += rows
+    
+    def _log_slow(self, conn: sqlite3.Connection, sql: str, params, seconds: float):
+        entry = {
+            'method': _caller(),
+            'sql': normalize_sql(sql),
+            'params': params_shape(params),
+            'ms': seconds * 1000,
+            'plan': explain(conn, sql, params),
+        }
+        self.slow_queries.append(entry)
+        logger.warning("Slow query (%.1f ms) in %s: %s [%s]\n%s", entry['ms'], entry['method'],
+                       entry['sql'], entry['params'], '\n'.join(entry['plan']))
+    
+    def method_stats(self) -> List[Dict]:
+        """Per Database method (get_connection blocks), most total time first"""
+        with self._lock:
+            stats = [{'method': method, **timing.to_dict()} for method, timing in self._methods.items()]
+        return sorted(stats, key=lambda row: -row['total_ms'])
+    
+    def statement_stats(self) -> List[Dict]:
+        """Per (method, statement), most total time first"""
+        with self._lock:
+            stats = [{'method': method, 'sql': sql, **timing.to_dict()}
+                     for (method, sql), timing in self._statements.items()]
+        return sorted(stats, key=lambda row: -row['total_ms'])
+    
+    def statement_examples(self) -> Dict[str, tuple]:
+        """{normalized sql: (sql, params)} from the latest execution of each statement"""
+        with self._lock:
+            return {sql: timing.example for (_, sql), timing in self._statements.items()}
+    
+    def report(self, db_path: str = None) -> str:
+        """Text report; with db_path, the query plan of every statement is included"""
+        lines = ["Methods (get_connection blocks)",
+                 f"{'calls':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows':>9}  method"]
+        for row in self.method_stats():
+            lines.append(f"{row['calls']:>7} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} "
+                         f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['rows']:>9}  {row['method']}")
+        
+        lines += ["", "Statements",
+                  f"{'calls':>7} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'rows':>9}  method: sql"]
+        for row in self.statement_stats():
+            sql = row['sql'] if len(row['sql']) <= 100 else row['sql'][:97] + '...'
+            lines.append(f"{row['calls']:>7} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} "
+                         f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['rows']:>9}  "
+                         f"{row['method']}: {sql}")
+        
+        if self.slow_queries:
+            lines += ["", f"Slow queries (>= {self.slow_ms:g} ms)"]
+            for entry in self.slow_queries:
+                lines.append(f"  {entry['ms']:.1f} ms in {entry['method']}: {entry['sql']} [{entry['params']}]")
+                lines.extend(f"      {step}" for step in entry['plan'])
+        
+        if db_path:
+            lines += ["", "Query plans"]
+            conn = sqlite3.connect(db_path)
+            try:
+                for sql, (raw_sql, params) in sorted(self.statement_examples().items()):
+                    if not re.match(r'\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b', raw_sql, re.I):
+                        continue
+                    plan = explain(conn, raw_sql, params)
+                    if plan:
+                        lines.append(f"  {sql}")
+                        lines.extend(f"      {step}" for step in plan)
+            finally:
+                conn.close()
+        return "\n".join(lines)
+
+
+PROFILER = QueryProfiler()
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that reports execute and fetch times to PROFILER"""
+    
+    _sample = None
+    
+    def _timed(self, sql: str, params, run):
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            elapsed = time.perf_counter() - start
+            # Writes report affected rows; selects count rows as they are fetched
+            rows = self.rowcount if self.description is None and self.rowcount > 0 else 0
+            self._sql, self._params, self._logged = sql, params, False
+            self._sample, self._timing = PROFILER._start(sql, params, elapsed, rows)
+            self._check_slow()
+    
+    def execute(self, sql, parameters=()):
+        return self._timed(sql, parameters, lambda: super(ProfiledCursor, self).execute(sql, parameters))
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sql, (), lambda: super(ProfiledCursor, self).executemany(sql, seq_of_parameters))
+    
+    def _fetched(self, start: float, rows: int):
+        if self._sample is not None:
+            PROFILER._add(self._sample, self._timing, time.perf_counter() - start, rows)
+            self._check_slow()
+    
+    def _check_slow(self):
+        if not self._logged and self._sample[0] * 1000 >= PROFILER.slow_ms:
+            self._logged = True
+            PROFILER._log_slow(self.connection, self._sql, self._params, self._sample[0])
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0)
+            raise
+        self._fetched(start, 1)
+        return row
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose statements all go through ProfiledCursor"""
+    
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def enable(slow_ms: float = None):
+    """Profile connections opened from now on"""
+    if slow_ms is not None:
+        PROFILER.slow_ms = slow_ms
+    PROFILER.enabled = True
+
+
+def disable():
+    """Stop profiling new connections (already profiled ones keep reporting)"""
+    PROFILER.enabled = False
+
+
+def is_enabled() -> bool:
+    return PROFILER.enabled
+
+
+def connection_factory():
+    """sqlite3.connect factory for new connections"""
+    return ProfiledConnection if PROFILER.enabled else sqlite3.Connection
+
+
+def block():
+    """Context timing a get_connection() block, a no-op unless profiling"""
+    return PROFILER.block() if PROFILER.enabled else contextlib.nullcontext()
+
+
+if os.environ.get('FLIPTRACK_PROFILE_QUERIES'):
+    enable(float(os.environ.get('FLIPTRACK_SLOW_QUERY_MS', DEFAULT_SLOW_MS)))
+
+
+def run_workload(db) -> None:
+    """Exercise the Database calls the dashboards, listings and reports make"""
+    from database import ITEM_LIST_COLUMNS
+    
+    db.get_dashboard_data()
+    page = db.get_items_page()
+    db.get_items_page(sort_by='potential_profit', descending=False)
+    db.get_items_page(status_filter='Sold')
+    if page['next_cursor']:
+        db.get_items_page(cursor=page['next_cursor'])
+    if page['items']:
+        item = page['items'][0]
+        db.get_item(item['id'])
+        db.get_items_page(search_query=item['item_name'].split()[0])
+    db.get_all_items(min_profit=10, max_profit=100, columns=ITEM_LIST_COLUMNS)
+    db.get_all_items(status_filter='Sold', include_archive=True)
+    tag_counts = db.get_tag_counts()
+    if tag_counts:
+        db.get_items_page(tags=[tag_counts[0]['tag']])
+    for _ in db.iter_items(columns=ITEM_LIST_COLUMNS):
+        pass
+    db.get_all_providers()
+    db.get_all_provider_stats()
+    try:
+        from analytics import get_analytics
+    except ImportError:
+        return
+    get_analytics(db, include_archive=True)
+
+
+if __name__ == "__main__":
+    # CLI: profile the common Database calls against a database file
+    if len(sys.argv) < 2 or sys.argv[1].lower() != "report":
+        print("FlipTrack Query Profiler")
+        print("\nUsage:")
+        print("  python query_profiler.py report [db_path] [slow_ms]")
+        sys.exit(1)
+    
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "tracker.db"
+    slow_ms = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_SLOW_MS
+    
+    try:
+        # Database imports this file as query_profiler, so use that module's profiler
+        import query_profiler
+        query_profiler.enable(slow_ms)
+        # Slow queries are listed in the report itself
+        query_profiler.logger.disabled = True
+        from database import Database
+        db = Database(db_path)
+        # Time the workload twice: a cold pass and a warm one
+        query_profiler.run_workload(db)
+        query_profiler.run_workload(db)
+        print(query_profiler.PROFILER.report(db_path))
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -3,7 +3,7 @@ import base64
 import qrcode
 from io import BytesIO
 from jinja2 import Template
-from typing import Dict, List
+from typing import Dict, Iterable
 from pathlib import Path
 
 class ReportGenerator:
@@ -74,36 +74,23 @@ class ReportGenerator:
         except Exception as e:
             raise Exception(f"Failed to generate report: {str(e)}")
     
-    def generate_master_index(self, items: List[Dict], web_mode: bool = False) -> str:
+    def generate_master_index(self, items: Iterable[Dict], web_mode: bool = False) -> str:
         """Generate a master index HTML file linking to all item reports
         
         Args:
-            items: List of item dictionaries
+            items: Item dicts or records (ITEM_LIST_COLUMNS is enough), e.g.
+                Database.iter_items(columns=ITEM_LIST_COLUMNS)
             web_mode: If True, generates links for Flask routes instead of file paths
         """
         try:
             template_str = self._get_index_template()
             template = Template(template_str)
             
-            # Calculate profits for each item
-            items_with_profits = []
-            for item in items:
-                potential_profit = item['target_price'] - item['purchase_price'] - item['shipping_cost']
-                actual_profit = 0
-                if item['status'] == 'Sold' and item.get('final_sold_price'):
-                    actual_profit = item['final_sold_price'] - item['purchase_price'] - item['shipping_cost']
-                
-                items_with_profits.append({
-                    **item,
-                    'potential_profit': potential_profit,
-                    'actual_profit': actual_profit
-                })
-            
-            html_content = template.render(items=items_with_profits, web_mode=web_mode)
-            
+            # Profits come from the items' generated columns, so items are not
+            # copied, and the page is streamed so items may be a generator
             index_path = self.reports_dir / "index.html"
             with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+                f.writelines(template.generate(items=items, web_mode=web_mode))
             
             return str(index_path)
         except Exception as e:
@@ -492,6 +479,8 @@ class ReportGenerator:
                 </thead>
                 <tbody>
                     {% for item in items %}
+                    {% set potential_profit = item.potential_profit %}
+                    {% set actual_profit = item.actual_profit if item.actual_profit is not none else 0 %}
                     <tr>
                         <td>{{ item.id }}</td>
                         <td>{{ item.item_name }}</td>
@@ -502,12 +491,12 @@ class ReportGenerator:
                         </td>
                         <td>${{ "%.2f"|format(item.purchase_price) }}</td>
                         <td>${{ "%.2f"|format(item.target_price) }}</td>
-                        <td class="{% if item.potential_profit >= 0 %}profit-positive{% else %}profit-negative{% endif %}">
-                            ${{ "%.2f"|format(item.potential_profit) }}
+                        <td class="{% if potential_profit >= 0 %}profit-positive{% else %}profit-negative{% endif %}">
+                            ${{ "%.2f"|format(potential_profit) }}
                         </td>
-                        <td class="{% if item.actual_profit >= 0 %}profit-positive{% else %}profit-negative{% endif %}">
+                        <td class="{% if actual_profit >= 0 %}profit-positive{% else %}profit-negative{% endif %}">
                             {% if item.status == 'Sold' %}
-                                ${{ "%.2f"|format(item.actual_profit) }}
+                                ${{ "%.2f"|format(actual_profit) }}
                             {% else %}
                                 -
                             {% endif %}
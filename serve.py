@@ -0,0 +1,111 @@
+"""
+FlipTrack production web server
+Run with: python serve.py [--server gunicorn|waitress] [--workers N] [--threads N]
+                          [--host HOST] [--port PORT] [--db PATH]
+
+Serves web_app.create_app() with several request threads, and on POSIX
+with gunicorn also several worker processes. Each worker builds its own
+app, so database connections, the page cache and the background job
+queue are per process; SQLite in WAL mode lets them share one tracker.db.
+Keep the database on a local disk: WAL needs shared memory, which network
+filesystems don't provide.
+
+Install one of: pip install waitress / pip install gunicorn
+"""
+
+import argparse
+import os
+import sys
+
+from config import WEB_HOST, WEB_PORT, WEB_THREADS, WEB_WORKERS
+from database import Database
+
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def default_server() -> str:
+    """gunicorn where it can run (POSIX), otherwise waitress"""
+    if os.name != 'nt' and _available('gunicorn'):
+        return 'gunicorn'
+    return 'waitress'
+
+
+def serve_gunicorn(db_path: str, host: str, port: int, workers: int, threads: int):
+    """Run gunicorn with threaded workers that each build their own app"""
+    from gunicorn.app.base import BaseApplication
+    
+    class FlipTrackApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            # Not preloaded: the app and its connections are created after the fork
+            self.cfg.set('preload_app', False)
+        
+        def load(self):
+            from web_app import create_app
+            return create_app(db_path)
+    
+    FlipTrackApplication().run()
+
+
+def serve_waitress(db_path: str, host: str, port: int, workers: int, threads: int):
+    """Run waitress, which serves from one process with a thread pool"""
+    from waitress import serve
+    from web_app import create_app
+    
+    if workers > 1:
+        print(f"waitress runs a single process; using {threads} threads and ignoring --workers {workers}")
+    serve(create_app(db_path), host=host, port=port, threads=threads)
+
+
+SERVERS = {
+    'gunicorn': serve_gunicorn,
+    'waitress': serve_waitress,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the FlipTrack web dashboard")
+    parser.add_argument('--server', choices=sorted(SERVERS), default=None,
+                        help="WSGI server (default: gunicorn if installed on POSIX, else waitress)")
+    parser.add_argument('--workers', type=int, default=WEB_WORKERS, help="worker processes (gunicorn)")
+    parser.add_argument('--threads', type=int, default=WEB_THREADS, help="request threads per worker")
+    parser.add_argument('--host', default=WEB_HOST)
+    parser.add_argument('--port', type=int, default=WEB_PORT)
+    parser.add_argument('--db', default="tracker.db", help="database file")
+    args = parser.parse_args(argv)
+    
+    server = args.server or default_server()
+    if server == 'gunicorn' and os.name == 'nt':
+        parser.error("gunicorn does not run on Windows; use --server waitress")
+    if not _available(server):
+        print(f"Error: {server} is not installed. Install it with: pip install {server}")
+        return 1
+    if args.workers < 1 or args.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    
+    # Migrate once here, before any worker opens the file
+    Database(args.db).close()
+    
+    print("=" * 60)
+    print("FlipTrack Web Dashboard")
+    print("=" * 60)
+    print(f"Server: {server} ({args.workers} worker(s) x {args.threads} thread(s))")
+    print(f"Database: {os.path.abspath(args.db)}")
+    print(f"Access at: http://localhost:{args.port}")
+    print(f"Press Ctrl+C to stop")
+    print("=" * 60)
+    SERVERS[server](args.db, args.host, args.port, args.workers, args.threads)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
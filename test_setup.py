@@ -91,7 +91,10 @@ def test_database():
         
         # Cleanup
         db.delete_item(item_id)
-        os.remove("test_tracker.db")
+        db.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists("test_tracker.db" + suffix):
+                os.remove("test_tracker.db" + suffix)
         print(f"  ✓ Cleaned up test database")
         
         print("\n✅ Database operations working!")
@@ -15,6 +15,15 @@ tests_failed = 0
 test_errors = []
 
 
+def remove_temp_db(db_path):
+    """Close pooled connections and delete a temporary database"""
+    from database import Database
+    Database.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
 def test(name):
     """Decorator for test functions"""
     def decorator(func):
@@ -41,11 +50,14 @@ def test(name):
 def test_imports():
     """Test that all core modules can be imported"""
     import database
+    import models
     import scraper
     import report_generator
     import utils
     import config
     import export_utils
+    import query_profiler
+    import jobs
     assert True
 
 
@@ -60,8 +72,75 @@ def test_database_init():
         db = Database(temp_db)
         assert os.path.exists(temp_db), "Database file not created"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
+
+
+@test("Pooled database connections")
+def test_connection_pool():
+    """Test connections are reused and use WAL journaling"""
+    import threading
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        with db.get_connection() as conn:
+            first = conn
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        with Database(temp_db).get_connection() as conn:
+            assert conn is first, "Connection was not reused"
+        assert mode == "wal", f"Expected WAL journal mode, got {mode}"
+        
+        # Short-lived threads (one per dev-server request) return their connection
+        def query():
+            db.get_all_items()
+            db.data_version()
+        
+        for _ in range(50):
+            threads = [threading.Thread(target=query) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # 200 threads, at most 4 at a time, so at most 4 connections were ever needed
+        assert db.pool.open_connections <= 4, f"{db.pool.open_connections} connections open"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Schema migrations")
+def test_schema_migrations():
+    """Test schema version is recorded and migrations are idempotent"""
+    from database import Database
+    from migrations import SCHEMA_VERSION, get_schema_version, migrate
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        with db.get_connection() as conn:
+            assert get_schema_version(conn) == SCHEMA_VERSION, "Schema version not recorded"
+            assert migrate(conn) == SCHEMA_VERSION, "Re-running migrations changed version"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Item filters use indexes")
+def test_item_indexes():
+    """Test status and provider filters are served by secondary indexes"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        with db.get_connection() as conn:
+            for where, params in (("status = ?", ("Listed",)), ("provider_id = ?", (1,))):
+                plan = conn.execute(
+                    f"EXPLAIN QUERY PLAN SELECT * FROM items WHERE {where} ORDER BY id DESC", params
+                ).fetchall()
+                detail = " ".join(row[3] for row in plan)
+                assert "USING INDEX" in detail, f"Full scan for {where}: {detail}"
+    finally:
+        remove_temp_db(temp_db)
 
 
 @test("Add item to database")
@@ -88,8 +167,7 @@ def test_add_item():
         assert item is not None, "Item not found"
         assert item['item_name'] == 'Test Item', "Item name mismatch"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
 
 
 @test("Update item in database")
@@ -120,8 +198,37 @@ def test_update_item():
         assert item['item_name'] == 'Updated Item', "Item name not updated"
         assert item['status'] == 'Listed', "Status not updated"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
+
+
+@test("Patch item fields")
+def test_patch_item():
+    """Test partial updates, status date stamping and version checks"""
+    from database import Database, ConcurrentUpdateError
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        item_id = db.add_item({'item_name': 'Test Item', 'purchase_price': 100.0,
+                               'shipping_cost': 10.0, 'target_price': 150.0,
+                               'notes': 'keep me'})
+        
+        assert db.patch_item(item_id, status='Sold', final_sold_price=140.0)
+        item = db.get_item(item_id)
+        assert item['status'] == 'Sold' and item['final_sold_price'] == 140.0
+        assert item['date_sold'], "Sold date not stamped"
+        assert item['notes'] == 'keep me', "Unpatched column changed"
+        
+        try:
+            db.patch_item(item_id, expected_version=item['version'] - 1, notes='stale')
+            assert False, "Stale version accepted"
+        except ConcurrentUpdateError:
+            pass
+        assert db.patch_item(item_id, expected_version=item['version'], notes='fresh')
+        assert db.get_item(item_id)['notes'] == 'fresh'
+        assert not db.patch_item(item_id + 1, status='Listed'), "Missing item reported as updated"
+    finally:
+        remove_temp_db(temp_db)
 
 
 @test("Delete item from database")
@@ -149,8 +256,7 @@ def test_delete_item():
         item = db.get_item(item_id)
         assert item is None, "Item should be deleted"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
 
 
 @test("Search and filter items")
@@ -202,8 +308,697 @@ def test_search_filter():
         results = db.get_all_items(search_query="Shoes", status_filter="Draft")
         assert len(results) == 1, f"Expected 1 result, got {len(results)}"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
+
+
+@test("Full-text search")
+def test_full_text_search():
+    """Test prefix/phrase search and index sync on update and delete"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        base = {'purchase_price': 10.0, 'shipping_cost': 1.0, 'target_price': 20.0}
+        jordan_id = db.add_item({**base, 'item_name': 'Nike Air Jordan 1', 'tags': 'retro'})
+        hoodie_id = db.add_item({**base, 'item_name': 'Supreme Box Logo Hoodie'})
+        
+        results = db.get_all_items(search_query="jor")
+        assert [i['id'] for i in results] == [jordan_id], "Prefix search failed"
+        
+        results = db.get_all_items(search_query='"box logo"')
+        assert [i['id'] for i in results] == [hoodie_id], "Phrase search failed"
+        
+        item = db.get_item(jordan_id)
+        item['tags'] = 'grail'
+        db.update_item(jordan_id, item)
+        assert db.get_all_items(search_query="retro") == [], "Stale tags still indexed"
+        assert len(db.get_all_items(search_query="grail")) == 1, "Updated tags not indexed"
+        
+        db.delete_item(hoodie_id)
+        assert db.get_all_items(search_query="hoodie") == [], "Deleted item still indexed"
+        
+        # Pages of a search are ranked like get_all_items, name matches first
+        name_ids = [db.add_item({**base, 'item_name': f'Vintage lamp {n}'}) for n in range(3)]
+        note_ids = [db.add_item({**base, 'item_name': f'Desk {n}', 'notes': 'lamp'}) for n in range(3)]
+        ranked = [i['id'] for i in db.get_all_items(search_query="lamp")]
+        assert set(ranked[:3]) == set(name_ids) and set(ranked[3:]) == set(note_ids), ranked
+        page = db.get_items_page(search_query="lamp", page_size=2)
+        assert page['sort_by'] == 'rank'
+        paged = [i['id'] for i in page['items']]
+        while page['next_cursor']:
+            page = db.get_items_page(search_query="lamp", page_size=2, cursor=page['next_cursor'])
+            paged += [i['id'] for i in page['items']]
+        assert paged == ranked, f"Paged order {paged} != ranked order {ranked}"
+        previous = db.get_items_page(search_query="lamp", page_size=2, cursor=page['prev_cursor'])
+        assert [i['id'] for i in previous['items']] == ranked[2:4]
+        by_id = db.get_items_page(search_query="lamp", sort_by='id')
+        assert [i['id'] for i in by_id['items']] == sorted(ranked, reverse=True)
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Summary statistics")
+def test_summary_stats():
+    """Test dashboard totals across statuses and fees"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        db.add_item({'item_name': 'Draft Item', 'purchase_price': 100.0, 'shipping_cost': 10.0,
+                     'target_price': 150.0, 'status': 'Draft', 'listing_fee': 5.0})
+        db.add_item({'item_name': 'Sold Item', 'purchase_price': 50.0, 'shipping_cost': 5.0,
+                     'target_price': 80.0, 'status': 'Sold', 'final_sold_price': 90.0})
+        
+        stats = db.get_summary_stats()
+        assert stats['total_items'] == 2
+        assert stats['draft_count'] == 1 and stats['sold_count'] == 1 and stats['listed_count'] == 0
+        assert stats['total_potential_profit'] == 35.0, f"Got {stats['total_potential_profit']}"
+        assert stats['total_actual_profit'] == 35.0, f"Got {stats['total_actual_profit']}"
+        assert stats['inventory_value'] == 115.0
+        assert stats['total_invested'] == 170.0
+        assert stats['total_revenue'] == 90.0
+        assert abs(stats['roi'] - (90.0 - 170.0) / 170.0 * 100) < 1e-9
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Profit filters and sorting")
+def test_profit_filters():
+    """Test generated profit columns drive SQL-side filters and sorts"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        for name, target in (('Low', 60.0), ('Mid', 100.0), ('High', 200.0)):
+            db.add_item({'item_name': name, 'purchase_price': 40.0, 'shipping_cost': 5.0,
+                         'target_price': target, 'listing_fee': 5.0})
+        
+        item = db.get_all_items(search_query="Mid")[0]
+        assert item['total_expenses'] == 50.0, f"Got {item['total_expenses']}"
+        assert item['potential_profit'] == 50.0, f"Got {item['potential_profit']}"
+        
+        results = db.get_all_items(min_profit=20.0, max_profit=100.0)
+        assert [i['item_name'] for i in results] == ['Mid'], f"Got {[i['item_name'] for i in results]}"
+        
+        results = db.get_all_items(sort_by='potential_profit', descending=False)
+        assert [i['item_name'] for i in results] == ['Low', 'Mid', 'High']
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Keyset pagination")
+def test_items_pagination():
+    """Test paging forward and back through a sorted, filtered listing"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        for i in range(12):
+            db.add_item({'item_name': f'Item {i:02d}', 'purchase_price': float(i % 4),
+                         'shipping_cost': 1.0, 'target_price': 50.0,
+                         'status': 'Listed' if i % 3 else 'Draft'})
+        
+        expected = [i['id'] for i in db.get_all_items(status_filter='Listed',
+                                                      sort_by='purchase_price', descending=False)]
+        seen = []
+        pages = []
+        cursor = None
+        while True:
+            page = db.get_items_page(status_filter='Listed', sort_by='purchase_price',
+                                     descending=False, cursor=cursor, page_size=3)
+            assert page['total'] == len(expected), f"Expected total {len(expected)}, got {page['total']}"
+            pages.append([i['id'] for i in page['items']])
+            seen.extend(pages[-1])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        assert seen == expected, f"Pages out of order: {seen}"
+        
+        previous = db.get_items_page(status_filter='Listed', sort_by='purchase_price',
+                                     descending=False, cursor=page['prev_cursor'], page_size=3)
+        assert [i['id'] for i in previous['items']] == pages[-2], "Previous page mismatch"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Provider statistics")
+def test_provider_stats():
+    """Test grouped provider stats match per-provider stats and rank by profit"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        unsold = db.add_provider({'name': 'Unsold Supplier'})
+        seller = db.add_provider({'name': 'Top Supplier'})
+        empty = db.add_provider({'name': 'Empty Supplier'})
+        db.add_item({'item_name': 'Listed', 'purchase_price': 10.0, 'shipping_cost': 1.0,
+                     'target_price': 50.0, 'provider_id': unsold})
+        db.add_item({'item_name': 'Sold', 'purchase_price': 10.0, 'shipping_cost': 1.0,
+                     'target_price': 50.0, 'provider_id': seller,
+                     'status': 'Sold', 'final_sold_price': 30.0})
+        
+        all_stats = db.get_all_provider_stats()
+        assert [ps['provider']['id'] for ps in all_stats][0] == seller, "Not ranked by actual profit"
+        for ps in all_stats:
+            assert ps['stats'] == db.get_provider_stats(ps['provider']['id']), \
+                f"Stats mismatch for {ps['provider']['name']}"
+        empty_stats = next(ps['stats'] for ps in all_stats if ps['provider']['id'] == empty)
+        assert empty_stats['total_items'] == 0
+        assert all_stats[0]['stats']['total_actual_profit'] == 19.0
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Tag filters")
+def test_tag_filters():
+    """Test normalized tags stay in sync and filter with any/all matching"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        prices = {'shipping_cost': 5.0, 'target_price': 150.0}
+        jordan = db.add_item({'item_name': 'Jordan 1', 'purchase_price': 100.0,
+                              'tags': 'Sneakers, Vintage, sneakers', **prices})
+        hoodie = db.add_item({'item_name': 'Hoodie', 'purchase_price': 40.0, 'tags': 'vintage', **prices})
+        db.add_items_bulk([{'item_name': 'Tee', 'purchase_price': 10.0, 'tags': 'tees,vintage', **prices}])
+        
+        assert len(db.get_all_items(tags=['vintage'])) == 3
+        assert [i['id'] for i in db.get_all_items(tags=['vintage', 'sneakers'], tag_mode='all')] == [jordan]
+        assert len(db.get_all_items(tags=['sneakers', 'tees'])) == 2
+        assert db.get_tag_counts()[0] == {'tag': 'vintage', 'count': 3}
+        
+        db.patch_item(hoodie, tags='streetwear')
+        assert db.get_items_page(tags=['streetwear'])['total'] == 1
+        assert len(db.get_all_items(tags=['vintage'])) == 2, "Stale tag rows after patch"
+        db.delete_item(jordan)
+        assert db.get_all_items(tags=['sneakers']) == [], "Tag rows left after delete"
+        
+        supplier = db.add_provider({'name': 'Thrift Co', 'tags': 'Bulk, vintage'})
+        db.add_provider({'name': 'Mall', 'tags': 'retail'})
+        assert [p['id'] for p in db.get_all_providers(tags=['bulk'])] == [supplier]
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Item images")
+def test_item_images():
+    """Test image lists live in item_images and are migrated from JSON columns"""
+    import sqlite3
+    import database
+    from database import Database
+    from migrations import MIGRATIONS
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    image_path = tempfile.mktemp(suffix=".jpg")
+    try:
+        with open(image_path, 'wb') as f:
+            f.write(b"not really a jpeg")
+        db = Database(temp_db)
+        item_id = db.add_item({'item_name': 'Camera', 'purchase_price': 50.0, 'shipping_cost': 5.0,
+                               'target_price': 120.0, 'selected_images': [image_path],
+                               'image_urls_cache': ['https://example.com/a.jpg']})
+        
+        listed = db.get_all_items()[0]
+        assert 'selected_images' not in listed, "List query loaded images"
+        assert db.get_all_items(include_images=True)[0]['selected_images'] == [image_path]
+        item = db.get_item(item_id)
+        assert item['image_urls_cache'] == ['https://example.com/a.jpg']
+        selected = db.get_item_images(item_id, role='selected')[0]
+        assert selected['size_bytes'] == 17 and len(selected['content_hash']) == 64
+        
+        db.update_item(item_id, {**item, 'item_name': 'Camera Body', 'image_urls_cache': []})
+        assert db.get_item(item_id)['selected_images'] == [image_path], "Omitted image list was cleared"
+        assert db.get_item(item_id)['image_urls_cache'] == []
+        
+        # Image files are read before the write transaction, not under its lock
+        original_metadata = database._image_metadata
+        
+        def checked_metadata(path):
+            assert getattr(db.pool._local, 'conn', None) is None, "Image read inside a transaction"
+            return original_metadata(path)
+        
+        database._image_metadata = checked_metadata
+        try:
+            db.patch_item(item_id, selected_images=[image_path])
+            db.add_items_bulk([{'item_name': 'Lens', 'purchase_price': 1.0, 'shipping_cost': 0.0,
+                                'target_price': 2.0, 'selected_images': [image_path]}] * 3, batch_size=2)
+            assert db.refresh_image_metadata(item_id) == 1
+        finally:
+            database._image_metadata = original_metadata
+        db.delete_item(item_id)
+        assert db.get_item_images(item_id) == [], "Image rows left after delete"
+        
+        # Upgrade a database that still stores JSON image columns
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        image_migration = next(m for m in MIGRATIONS if m[2].__name__ == '_v8_item_images')
+        for version, _, upgrade in MIGRATIONS:
+            if version < image_migration[0]:
+                upgrade(conn)
+        conn.execute("""INSERT INTO items (item_name, purchase_price, shipping_cost, target_price,
+                        selected_images, image_urls_cache) VALUES ('Old', 1, 1, 1, ?, '')""",
+                     ('["a.jpg", "b.jpg"]',))
+        conn.execute("""INSERT INTO items (item_name, purchase_price, shipping_cost, target_price)
+                        VALUES ('Gone', 1, 1, 1)""")
+        conn.execute("DELETE FROM items WHERE item_name = 'Gone'")
+        schema_before = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE tbl_name = 'items' AND type IN ('index', 'trigger')")}
+        image_migration[2](conn)
+        rows = conn.execute("SELECT role, ordinal, path FROM item_images ORDER BY ordinal").fetchall()
+        assert [tuple(r) for r in rows] == [('selected', 0, 'a.jpg'), ('selected', 1, 'b.jpg')]
+        
+        # The legacy columns are dropped by a table rebuild, which works before SQLite 3.35
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(items)")}
+        assert not columns & {'selected_images', 'image_urls_cache'}, "Legacy image columns kept"
+        assert 'potential_profit' in columns
+        schema_after = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE tbl_name = 'items' AND type IN ('index', 'trigger')")}
+        assert schema_before <= schema_after, f"Lost {schema_before - schema_after}"
+        assert conn.execute("SELECT potential_profit FROM items").fetchone()[0] == -1
+        conn.execute("""INSERT INTO items (item_name, purchase_price, shipping_cost, target_price)
+                        VALUES ('New', 1, 1, 1)""")
+        assert conn.execute("SELECT MAX(id) FROM items").fetchone()[0] == 3, "Deleted id reused"
+        conn.close()
+    finally:
+        remove_temp_db(temp_db)
+        if os.path.exists(image_path):
+            os.remove(image_path)
+
+
+@test("Stats rollup")
+def test_stats_rollup():
+    """Test trigger-maintained rollups match a rebuild from scratch"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        provider_id = db.add_provider({'name': 'Rollup Supplier'})
+        base = {'purchase_price': 20.0, 'shipping_cost': 2.5, 'target_price': 60.0}
+        ids = db.add_items_bulk([
+            {'item_name': f'Item {n}', 'category': 'Shoes' if n % 2 else 'Tops',
+             'provider_id': provider_id if n % 3 else None, **base}
+            for n in range(12)
+        ])
+        for item_id in ids[:5]:
+            db.patch_item(item_id, status='Sold', final_sold_price=75.0, sales_channel='eBay')
+        db.patch_item(ids[5], status='Listed', listing_fee=1.5)
+        db.patch_item(ids[6], notes='Not a rollup column')
+        db.delete_item(ids[0])
+        
+        stats = db.get_summary_stats()
+        assert stats['total_items'] == 11 and stats['sold_count'] == 4
+        assert abs(stats['total_actual_profit'] - 4 * (75.0 - 22.5)) < 1e-9
+        channel = {row['key']: row for row in db.get_rollup('channel')}['eBay']
+        assert channel['sold_count'] == 4 and channel['revenue'] == 300.0
+        assert db.rebuild_rollups() == [], "Incremental rollup drifted from rebuild"
+        
+        for item_id in ids[1:]:
+            db.delete_item(item_id)
+        assert db.get_summary_stats()['total_items'] == 0
+        assert db.get_rollup('category') == [], "Empty rollup rows not removed"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Change tracking")
+def test_change_tracking():
+    """Test data_version moves on every write and updated_at is maintained"""
+    import sqlite3
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        start = db.data_version()
+        assert db.data_version() == start, "Version moved without a write"
+        
+        item_id = db.add_item({'item_name': 'Watch', 'purchase_price': 80.0,
+                               'shipping_cost': 0.0, 'target_price': 150.0})
+        after_add = db.data_version()
+        assert after_add > start
+        stamped = db.get_item(item_id)['updated_at']
+        assert stamped, "updated_at not set on insert"
+        
+        # A write from another connection (as another process would) is seen too
+        other = sqlite3.connect(temp_db)
+        other.execute("UPDATE items SET notes = 'edited elsewhere', updated_at = '' WHERE id = ?", (item_id,))
+        other.execute("UPDATE items SET notes = 'edited again' WHERE id = ?", (item_id,))
+        other.commit()
+        other.close()
+        assert db.data_version() > after_add, "Change from another connection missed"
+        assert db.get_item(item_id)['updated_at'] not in ('', stamped), "updated_at not stamped by trigger"
+        
+        version = db.data_version()
+        db.add_provider({'name': 'Counter Supplier'})
+        assert db.data_version() > version, "Provider write did not bump version"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Item records")
+def test_item_records():
+    """Test projected listings return mapping-compatible Item records"""
+    from database import Database, ITEM_LIST_COLUMNS
+    from models import Item
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        item_id = db.add_item({'item_name': 'Lamp', 'purchase_price': 30.0, 'shipping_cost': 5.0,
+                               'target_price': 80.0, 'listing_fee': 2.0, 'notes': 'x' * 1000,
+                               'status': 'Sold', 'final_sold_price': 70.0})
+        
+        record = db.get_items_page()['items'][0]
+        assert isinstance(record, Item)
+        assert 'notes' not in record, "Listing selected unused columns"
+        assert record['item_name'] == record.item_name == record.get('item_name') == 'Lamp'
+        assert set(record) == set(ITEM_LIST_COLUMNS)
+        
+        full = db.get_item(item_id)
+        assert dict(db.get_all_items(columns=ITEM_LIST_COLUMNS)[0]) == \
+            {column: full[column] for column in ITEM_LIST_COLUMNS}
+        
+        # Profit properties fall back to computing from the selected fields
+        narrow = db.get_all_items(columns=('id', 'status', 'purchase_price', 'shipping_cost',
+                                           'target_price', 'final_sold_price'))[0]
+        assert narrow['potential_profit'] == 45.0 and narrow.actual_profit == 35.0
+        narrow['selected_images'] = []
+        assert narrow.to_dict()['selected_images'] == []
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Streaming item scans")
+def test_iter_items():
+    """Test iter_items streams the same rows as get_all_items and backs JSON export"""
+    import json
+    import database
+    import export_utils
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    temp_json = tempfile.mktemp(suffix=".json")
+    original_db_init = database.Database.__init__
+    
+    def temp_db_init(self, db_path=None):
+        original_db_init(self, temp_db)
+    
+    try:
+        database.Database.__init__ = temp_db_init
+        db = database.Database()
+        db.add_items_bulk({'item_name': f'Item {n}', 'purchase_price': float(n), 'shipping_cost': 1.0,
+                           'target_price': 50.0, 'status': 'Listed' if n % 2 else 'Draft',
+                           'selected_images': [f'img_{n}.jpg']} for n in range(25))
+        
+        streamed = list(db.iter_items(chunk_size=4, include_images=True))
+        assert streamed == db.get_all_items(include_images=True), "Streamed rows differ"
+        listed = [item['id'] for item in db.iter_items(status_filter='Listed', chunk_size=3)]
+        assert listed == [item['id'] for item in db.get_all_items(status_filter='Listed')]
+        
+        # Writes while a scan is open do not disturb it
+        scan = db.iter_items(chunk_size=2)
+        first = next(scan)
+        db.patch_item(first['id'], notes='touched')
+        assert len([first, *scan]) == 25
+        
+        path = export_utils.export_to_json(temp_json)
+        with open(path, encoding='utf-8') as f:
+            backup = json.load(f)
+        assert backup['item_count'] == 25 and len(backup['items']) == 25
+        assert backup['items'][0]['selected_images'] == ['img_24.jpg']
+    finally:
+        database.Database.__init__ = original_db_init
+        remove_temp_db(temp_db)
+        if os.path.exists(temp_json):
+            os.remove(temp_json)
+
+
+@test("Columnar analytics")
+def test_analytics():
+    """Test NumPy breakdowns match SQL totals and are cached until a write"""
+    from database import Database
+    from analytics import get_analytics
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        base = {'purchase_price': 20.0, 'shipping_cost': 5.0, 'target_price': 60.0}
+        db.add_items_bulk([
+            {'item_name': f'Item {n}', 'category': ['Shoes', 'Tops', ''][n % 3],
+             'sales_channel': 'eBay' if n % 2 else 'Mercari', **base}
+            for n in range(9)
+        ])
+        for item_id in (1, 2, 3, 4):
+            db.patch_item(item_id, status='Sold', final_sold_price=45.0)
+        db.patch_item(5, status='Sold')  # Sold without a price has no profit
+        
+        report = get_analytics(db)
+        stats = db.get_summary_stats()
+        assert abs(report.summary['total_actual_profit'] - stats['total_actual_profit']) < 1e-9
+        assert abs(report.summary['roi'] - stats['roi']) < 1e-9
+        channels = {group['key']: group for group in report.channels}
+        for row in db.get_rollup('channel'):
+            if row['sold_count']:
+                assert channels[row['key']]['profit'] == row['actual_profit'], row['key']
+        shoes = next(group for group in report.categories if group['key'] == 'Shoes')
+        assert shoes['items'] == 3 and shoes['sold'] == 2
+        
+        from datetime import date
+        assert sum(q['count'] for q in report.quarterly_profit(date.today().year).values()) == 5
+        assert sum(bucket['count'] for bucket in report.margin_distribution()) == 4
+        
+        assert get_analytics(db) is report, "Analytics reloaded without a write"
+        db.patch_item(6, notes='changed')
+        assert get_analytics(db) is not report, "Analytics not reloaded after a write"
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Item archive")
+def test_item_archive():
+    """Test archiving old sold items keeps them out of live queries only"""
+    from database import Database
+    from analytics import get_analytics
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        prices = {'purchase_price': 10.0, 'shipping_cost': 2.0, 'target_price': 30.0}
+        old_id = db.add_item({'item_name': 'Vintage lamp', 'tags': 'home, lighting',
+                              'selected_images': ['lamp.jpg'], **prices})
+        new_id = db.add_item({'item_name': 'Desk lamp', **prices})
+        draft_id = db.add_item({'item_name': 'Floor lamp', **prices})
+        db.patch_item(old_id, status='Sold', final_sold_price=40.0, date_sold='2020-03-01')
+        db.patch_item(new_id, status='Sold', final_sold_price=25.0, date_sold='2024-06-01')
+        lifetime = db.get_summary_stats(include_archive=True)
+        
+        assert db.archive_sold_before('2021-01-01') == 1
+        assert db.archive_sold_before('2021-01-01') == 0
+        
+        live_ids = [item['id'] for item in db.get_all_items()]
+        assert live_ids == [draft_id, new_id], live_ids
+        assert db.get_all_items(search_query='Vintage') == []
+        assert db.get_summary_stats()['sold_count'] == 1
+        assert db.rebuild_rollups() == [], "Rollup drifted after archiving"
+        
+        archived = db.get_item(old_id)
+        assert archived['archived_at'] and archived['selected_images'] == ['lamp.jpg']
+        
+        # Archived rows are read-only apart from the cached report path
+        try:
+            db.update_item(old_id, {**archived, 'item_name': 'Renamed'})
+            assert False, "Updating an archived item should fail"
+        except Exception as e:
+            assert 'archived' in str(e)
+        db.update_report_path(old_id, 'reports/lamp.html')
+        assert db.get_item(old_id)['report_path'] == 'reports/lamp.html'
+        assert db.get_item(old_id)['item_name'] == 'Vintage lamp'
+        provider_id = db.add_provider({'name': 'Lamp Supplier'})
+        db.patch_item(new_id, provider_id=provider_id)
+        with db.get_connection() as conn:
+            conn.execute("UPDATE items_archive SET provider_id = ? WHERE id = ?", (provider_id, old_id))
+        db.delete_provider(provider_id)
+        assert db.get_item(old_id)['provider_id'] is None and db.get_item(new_id)['provider_id'] is None
+        assert db.get_all_items(tags=['lighting']) == []
+        assert [i['id'] for i in db.get_all_items(include_archive=True)] == [draft_id, new_id, old_id]
+        assert [i['id'] for i in db.iter_items(search_query='Vintage', include_archive=True)] == [old_id]
+        sold = db.get_all_items(status_filter='Sold', include_archive=True, sort_by='date_sold')
+        assert [item['id'] for item in sold] == [new_id, old_id]
+        
+        assert db.get_summary_stats(include_archive=True) == lifetime
+        report = get_analytics(db, include_archive=True)
+        assert report.summary['total_actual_profit'] == lifetime['total_actual_profit']
+        assert get_analytics(db).summary['sold_count'] == 1
+        
+        before = db.data_version()
+        db.delete_item(old_id)
+        assert db.get_item(old_id) is None and db.get_item_images(old_id) == []
+        assert db.data_version() != before, "Deleting an archived item left data_version unchanged"
+        assert get_analytics(db, include_archive=True).summary['total_items'] == \
+            db.get_summary_stats(include_archive=True)['total_items']
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Bulk item operations")
+def test_bulk_item_operations():
+    """Test bulk status changes and deletes run as single transactions"""
+    from database import Database
+    from utils import remove_item_files
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    images_dir = tempfile.mkdtemp()
+    try:
+        db = Database(temp_db)
+        prices = {'purchase_price': 10.0, 'shipping_cost': 2.0, 'target_price': 30.0}
+        ids = db.add_items_bulk([{'item_name': f'Item {n}', 'tags': 'bulk', **prices} for n in range(6)])
+        
+        assert db.bulk_update_status(ids[:3], 'Sold', final_sold_price=25.0) == 3
+        sold = db.get_all_items(status_filter='Sold')
+        assert len(sold) == 3 and all(item['date_sold'] and item['version'] == 1 for item in sold)
+        assert db.get_summary_stats()['total_actual_profit'] == 3 * 13.0
+        try:
+            db.bulk_update_status(ids, 'Gone')
+            assert False, "Invalid status accepted"
+        except ValueError:
+            pass
+        
+        db.patch_item(ids[0], date_sold='2020-01-01')
+        db.archive_sold_before('2021-01-01')
+        Path(images_dir, f'item_{ids[0]}').mkdir()
+        deleted = db.delete_items([ids[0], ids[1], ids[1], 9999])
+        assert sorted(item['id'] for item in deleted) == [ids[0], ids[1]]
+        assert db.get_item(ids[0]) is None and db.get_item(ids[1]) is None
+        assert db.get_tag_counts()[0]['count'] == 4
+        assert db.rebuild_rollups() == []
+        
+        remove_item_files(deleted, images_dir).join()
+        assert not Path(images_dir, f'item_{ids[0]}').exists()
+    finally:
+        shutil.rmtree(images_dir, ignore_errors=True)
+        remove_temp_db(temp_db)
+
+
+@test("Query profiler")
+def test_query_profiler():
+    """Test opt-in timings per method and statement, and slow-query plans"""
+    from database import Database
+    import query_profiler
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    profiler = query_profiler.PROFILER
+    query_profiler.logger.disabled = True
+    try:
+        query_profiler.enable(slow_ms=0)
+        profiler.reset()
+        db = Database(temp_db)
+        prices = {'purchase_price': 10.0, 'shipping_cost': 2.0, 'target_price': 30.0}
+        db.add_items_bulk([{'item_name': f'Item {n}', **prices} for n in range(5)])
+        for _ in range(3):
+            assert len(db.get_all_items(status_filter='Draft')) == 5
+        assert len(list(db.iter_items(chunk_size=2))) == 5
+        
+        methods = {row['method']: row for row in profiler.method_stats()}
+        listing = methods['Database.get_all_items']
+        assert listing['calls'] == 3 and listing['rows'] == 15, listing
+        assert listing['p50_ms'] <= listing['p95_ms'] <= listing['p99_ms']
+        scan = next(row for row in profiler.statement_stats() if row['method'] == 'Database.iter_items'
+                    and row['sql'].startswith('SELECT'))
+        assert scan['rows'] == 5, scan
+        
+        slow = next(entry for entry in profiler.slow_queries if entry['method'] == 'Database.get_all_items')
+        assert slow['params'] == '1 params (str)', slow['params']
+        assert any('idx_items_status' in step for step in slow['plan']), slow['plan']
+        assert 'idx_items_status' in profiler.report(temp_db)
+    finally:
+        query_profiler.disable()
+        profiler.slow_ms = query_profiler.DEFAULT_SLOW_MS
+        profiler.reset()
+        query_profiler.logger.disabled = False
+        remove_temp_db(temp_db)
+
+
+@test("Dashboard data")
+def test_dashboard_data():
+    """Test the dashboard reads only recent items and is cached until a write"""
+    from database import Database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        prices = {'purchase_price': 10.0, 'shipping_cost': 2.0, 'target_price': 30.0}
+        ids = db.add_items_bulk([{'item_name': f'Item {n}', **prices} for n in range(15)])
+        
+        recent = db.get_recent_items(5)
+        assert [item['id'] for item in recent] == ids[::-1][:5]
+        assert recent[0].potential_profit == 18.0
+        
+        dashboard = db.get_dashboard_data(recent_limit=10)
+        assert len(dashboard['recent_items']) == 10
+        assert dashboard['stats'] == db.get_summary_stats()
+        assert db.get_dashboard_data(recent_limit=10) is dashboard, "Reloaded without a write"
+        
+        db.patch_item(ids[-1], status='Sold', final_sold_price=40.0)
+        refreshed = db.get_dashboard_data(recent_limit=10)
+        assert refreshed is not dashboard and refreshed['stats']['sold_count'] == 1
+        assert refreshed['recent_items'][0]['status'] == 'Sold'
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Background jobs")
+def test_background_jobs():
+    """Test jobs are recorded, retried after failures and marked failed at the limit"""
+    from database import Database
+    from jobs import JobQueue
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    queue = None
+    try:
+        db = Database(temp_db)
+        item_id = db.add_item({'item_name': 'Lamp', 'purchase_price': 10.0,
+                               'shipping_cost': 2.0, 'target_price': 30.0})
+        calls = []
+        
+        def flaky(db, job):
+            calls.append(job['attempts'])
+            if job['attempts'] < 2:
+                raise IOError("disk busy")
+            db.update_report_path(job['item_id'], f"report_{job['payload']['tag']}.html")
+        
+        def broken(db, job):
+            raise ValueError("bad template")
+        
+        queue = JobQueue(temp_db, handlers={'flaky': flaky, 'broken': broken}, retry_delay=0.01)
+        job = queue.wait(queue.submit('flaky', item_id, tag='a'), timeout=10)
+        assert job['status'] == 'done' and job['attempts'] == 2, job
+        assert calls == [1, 2]
+        assert db.get_item(item_id)['report_path'] == 'report_a.html'
+        
+        job = queue.wait(queue.submit('broken', item_id, max_attempts=2), timeout=10)
+        assert job['status'] == 'failed' and job['attempts'] == 2, job
+        assert job['error'] == 'ValueError: bad template'
+        assert db.get_latest_item_job(item_id)['id'] == job['id']
+        assert db.get_latest_item_job(item_id, 'flaky')['status'] == 'done'
+        
+        # A queued job with no payload is reused rather than duplicated
+        pending_id = db.add_job('flaky', item_id)
+        assert queue.submit('flaky', item_id) == pending_id
+        try:
+            queue.submit('unknown', item_id)
+            assert False, "Unknown job kind accepted"
+        except ValueError:
+            pass
+    finally:
+        if queue is not None:
+            queue.shutdown()
+        remove_temp_db(temp_db)
 
 
 @test("Profit calculations")
@@ -291,7 +1086,7 @@ def test_validate_item_name():
 @test("Report generation")
 def test_report_generation():
     """Test HTML report generation"""
-    from database import Database
+    from database import Database, ITEM_LIST_COLUMNS
     from report_generator import ReportGenerator
     
     temp_db = tempfile.mktemp(suffix=".db")
@@ -323,9 +1118,15 @@ def test_report_generation():
             content = f.read()
             assert 'Test Item' in content, "Item name not in report"
             assert '$100.00' in content, "Purchase price not in report"
+        
+        # The master index shows the generated profit columns, fees included
+        db.patch_item(item_id, listing_fee=5.0, status='Sold', final_sold_price=170.0)
+        index_path = generator.generate_master_index(db.iter_items(columns=ITEM_LIST_COLUMNS))
+        with open(index_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert '$35.00' in content and '$55.00' in content, "Index profits ignore fees"
     finally:
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
         if os.path.exists(temp_reports):
             shutil.rmtree(temp_reports)
 
@@ -369,8 +1170,232 @@ def test_csv_export():
             assert 'ID' in content, "CSV header missing"
     finally:
         database.Database.__init__ = original_db_init
-        if os.path.exists(temp_db):
-            os.remove(temp_db)
+        remove_temp_db(temp_db)
+        if os.path.exists(temp_csv):
+            os.remove(temp_csv)
+
+
+@test("Streaming exports")
+def test_streaming_exports():
+    """Test CSV/NDJSON chunks stream in batches and gzip round-trips"""
+    import csv
+    import gzip
+    import io
+    import json
+    from database import Database
+    from export_utils import CSV_FIELDNAMES, gzip_chunks, iter_csv, iter_ndjson
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    try:
+        db = Database(temp_db)
+        prices = {'purchase_price': 10.0, 'shipping_cost': 2.0, 'target_price': 30.0}
+        db.add_items_bulk([{'item_name': f'Item {n}', 'tags': 'even' if n % 2 == 0 else '',
+                            'selected_images': [f'img_{n}.jpg'], **prices} for n in range(25)])
+        
+        chunks = list(iter_csv(db.iter_items(include_images=True), batch_size=10))
+        assert len(chunks) == 4, "Expected header then rows in batches of 10"
+        assert chunks[0].strip() == ','.join(CSV_FIELDNAMES)
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        assert len(rows) == 25 and rows[0]['Image Count'] == '1'
+        assert rows[0]['Potential Profit'] == '18.00'
+        
+        lines = ''.join(iter_ndjson(db.iter_items(tags=['even'], include_images=True))).splitlines()
+        assert len(lines) == 13
+        assert json.loads(lines[0])['selected_images'] == ['img_24.jpg']
+        
+        compressed = b''.join(gzip_chunks(iter_csv(db.iter_items(include_images=True))))
+        assert gzip.decompress(compressed).decode('utf-8') == ''.join(chunks)
+    finally:
+        remove_temp_db(temp_db)
+
+
+@test("Web app factory")
+def test_web_app_factory():
+    """Test apps built per database file stay isolated and survive a fork reset"""
+    import gc
+    import shutil
+    import weakref
+    from database import Database
+    from web_app import create_app
+    
+    temp_dbs = [tempfile.mktemp(suffix=".db") for _ in range(2)]
+    upload_dir = tempfile.mkdtemp()
+    apps = [create_app(path, {'UPLOAD_FOLDER': upload_dir, 'JOB_WORKERS': 1}) for path in temp_dbs]
+    try:
+        client = apps[0].test_client()
+        response = client.post('/item/add', data={'item_name': 'Factory Item', 'purchase_price': '5',
+                                                  'shipping_cost': '1', 'target_price': '20'})
+        assert response.status_code == 302, f"Add failed: {response.status_code}"
+        assert b'Factory Item' in client.get('/items').data
+        assert b'Factory Item' not in apps[1].test_client().get('/items').data
+        
+        # The report is rendered by this app's own job queue
+        services = apps[0].extensions['fliptrack']
+        item_id = int(response.headers['Location'].rsplit('/', 1)[1])
+        job = services.job_queue.wait(services.db.get_latest_item_job(item_id)['id'], timeout=30)
+        assert job['status'] == 'done', f"Report job ended as {job['status']}: {job['error']}"
+        report_path = services.db.get_item(item_id)['report_path']
+        assert report_path and os.path.exists(report_path)
+        os.remove(report_path)
+        
+        # What a forked worker sees: fresh pools, same schema, same data
+        pool = Database(temp_dbs[0]).pool
+        Database._after_fork()
+        assert Database(temp_dbs[0]).pool is not pool
+        assert b'Factory Item' in client.get('/items').data
+        
+        # Apps are not pinned by process-wide hooks once dropped
+        throwaway = create_app(temp_dbs[1], {'UPLOAD_FOLDER': upload_dir})
+        services = weakref.ref(throwaway.extensions['fliptrack'])
+        del throwaway
+        gc.collect()
+        assert services() is None, "App services kept alive after the app was dropped"
+    finally:
+        for app in apps:
+            app.extensions['fliptrack'].shutdown()
+        for path in temp_dbs:
+            remove_temp_db(path)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+@test("Provider items screen")
+def test_provider_items_screen():
+    """Test the TUI provider items screen lists the provider's items"""
+    import asyncio
+    import database
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    original_db_init = database.Database.__init__
+    
+    def temp_db_init(self, db_path=None):
+        original_db_init(self, temp_db)
+    
+    try:
+        database.Database.__init__ = temp_db_init
+        from main import ProviderItemsScreen, ResellingTrackerApp
+        from textual.widgets import DataTable
+        
+        db = database.Database()
+        provider_id = db.add_provider({'name': 'Screen Supplier'})
+        for name in ('Screen A', 'Screen B'):
+            db.add_item({'item_name': name, 'purchase_price': 10.0, 'shipping_cost': 2.0,
+                         'target_price': 30.0, 'provider_id': provider_id})
+        db.add_item({'item_name': 'Other', 'purchase_price': 1.0, 'shipping_cost': 0.0,
+                     'target_price': 2.0})
+        
+        async def run():
+            app = ResellingTrackerApp()
+            async with app.run_test() as pilot:
+                await app.push_screen(ProviderItemsScreen(provider_id, 'Screen Supplier'))
+                await pilot.pause()
+                table = app.screen.query_one("#provider-items-table", DataTable)
+                rows = [table.get_row_at(i) for i in range(table.row_count)]
+                errors = [n.message for n in app._notifications if n.severity == 'error']
+                return rows, errors
+        
+        rows, errors = asyncio.run(run())
+        assert not errors, f"Screen reported errors: {errors}"
+        assert sorted(row[1] for row in rows) == ['Screen A', 'Screen B']
+        assert all(len(row) == 6 and row[5] == '$18.00' for row in rows)
+    finally:
+        database.Database.__init__ = original_db_init
+        remove_temp_db(temp_db)
+
+
+@test("Full backup")
+def test_full_backup():
+    """Test the backup copy includes commits still held in the WAL file"""
+    import shutil
+    import sqlite3
+    import database
+    import export_utils
+    
+    work_dir = tempfile.mkdtemp()
+    temp_db = os.path.join(work_dir, "tracker.db")
+    original_db_init = database.Database.__init__
+    original_cwd = os.getcwd()
+    
+    def temp_db_init(self, db_path=None):
+        original_db_init(self, temp_db)
+    
+    try:
+        database.Database.__init__ = temp_db_init
+        os.chdir(work_dir)
+        db = database.Database()
+        for n in range(5):
+            db.add_item({'item_name': f'Backup {n}', 'purchase_price': 1.0, 'shipping_cost': 0.0,
+                         'target_price': 2.0})
+        assert os.path.getsize(temp_db + "-wal") > 0, "Expected commits pending in the WAL"
+        
+        backup_dir = export_utils.create_full_backup(os.path.join(work_dir, "backup"))
+        conn = sqlite3.connect(os.path.join(backup_dir, "tracker.db"))
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 5
+        finally:
+            conn.close()
+    finally:
+        os.chdir(original_cwd)
+        database.Database.__init__ = original_db_init
+        remove_temp_db(temp_db)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+@test("Bulk insert and CSV import")
+def test_bulk_insert():
+    """Test batched inserts return ids in order and CSV import uses them"""
+    import json
+    import database
+    import export_utils
+    
+    temp_db = tempfile.mktemp(suffix=".db")
+    temp_csv = tempfile.mktemp(suffix=".csv")
+    original_db_init = database.Database.__init__
+    
+    def temp_db_init(self, db_path=None):
+        original_db_init(self, temp_db)
+    
+    try:
+        database.Database.__init__ = temp_db_init
+        db = database.Database()
+        
+        items = ({'item_name': f'Bulk {i}', 'purchase_price': 1.0, 'shipping_cost': 0.0,
+                  'target_price': 2.0, 'status': 'Listed'} for i in range(25))
+        ids = db.add_items_bulk(items, batch_size=10)
+        assert len(ids) == 25, f"Expected 25 ids, got {len(ids)}"
+        assert [db.get_item(i)['item_name'] for i in (ids[0], ids[-1])] == ['Bulk 0', 'Bulk 24']
+        assert db.get_item(ids[0])['date_listed'], "Status dates not stamped"
+        
+        provider_ids = db.add_providers_bulk([{'name': 'A'}, {'name': 'B'}])
+        assert [db.get_provider(i)['name'] for i in provider_ids] == ['A', 'B']
+        
+        with open(temp_csv, 'w', encoding='utf-8', newline='') as f:
+            f.write("Item Name,Purchase Price,Shipping Cost,Target Price\n")
+            f.write("Imported,5,1,20\n")
+            f.write(",5,1,20\n")
+            f.write("Bad Price,abc,1,20\n")
+        success, errors = export_utils.import_from_csv(temp_csv)
+        assert (success, errors) == (1, 2), f"Expected (1, 2), got {(success, errors)}"
+        assert len(db.get_all_items()) == 26
+        
+        # A row the database rejects partway through a batch is skipped, not fatal
+        rows = [{'item_name': f'Restore {i}', 'purchase_price': 1.0, 'shipping_cost': 0.0,
+                 'target_price': 2.0, 'tags': 'ok'} for i in range(5)]
+        rows[2]['tags'] = 123  # not a string, so syncing its tags fails
+        failed = []
+        ids = db.add_items_bulk(rows, batch_size=4, on_error=lambda item, e: failed.append(item['item_name']))
+        assert failed == ['Restore 2'], failed
+        assert [db.get_item(i)['item_name'] for i in ids] == ['Restore 0', 'Restore 1', 'Restore 3', 'Restore 4']
+        
+        with open(temp_csv.replace('.csv', '.json'), 'w', encoding='utf-8') as f:
+            json.dump({'items': rows}, f)
+        try:
+            assert export_utils.restore_from_json(temp_csv.replace('.csv', '.json')) == 4
+        finally:
+            os.remove(temp_csv.replace('.csv', '.json'))
+        assert len(db.get_all_items()) == 34
+    finally:
+        database.Database.__init__ = original_db_init
+        remove_temp_db(temp_db)
         if os.path.exists(temp_csv):
             os.remove(temp_csv)
 
@@ -385,16 +1410,42 @@ def run_tests():
     # Run all test functions
     test_imports()
     test_database_init()
+    test_connection_pool()
+    test_schema_migrations()
+    test_item_indexes()
     test_add_item()
     test_update_item()
+    test_patch_item()
     test_delete_item()
     test_search_filter()
+    test_full_text_search()
+    test_summary_stats()
+    test_profit_filters()
+    test_items_pagination()
+    test_provider_stats()
+    test_tag_filters()
+    test_item_images()
+    test_stats_rollup()
+    test_change_tracking()
+    test_item_records()
+    test_iter_items()
+    test_analytics()
+    test_item_archive()
+    test_bulk_item_operations()
+    test_query_profiler()
+    test_dashboard_data()
+    test_background_jobs()
     test_profit_calculations()
     test_validate_price()
     test_validate_url()
     test_validate_item_name()
     test_report_generation()
     test_csv_export()
+    test_streaming_exports()
+    test_web_app_factory()
+    test_provider_items_screen()
+    test_full_backup()
+    test_bulk_insert()
     
     # Print summary
     print()
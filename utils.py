@@ -201,3 +201,31 @@ def cleanup_temp_files(directory: str, pattern: str = "temp_*"):
     except Exception as e:
         print(f"Error cleaning up temp files: {e}")
         return False
+
+def remove_item_files(items: list, images_dir: str = "data/images", background: bool = True):
+    """Remove the image directory and report of each deleted item
+    
+    items are dicts with id and report_path (as Database.delete_items
+    returns). By default this runs in a daemon thread so callers do not
+    wait on the filesystem; returns the thread, or None when run inline.
+    """
+    def remove():
+        import shutil
+        for item in items:
+            try:
+                item_dir = Path(images_dir) / f"item_{item['id']}"
+                if item_dir.exists():
+                    shutil.rmtree(item_dir)
+                report_path = item.get('report_path')
+                if report_path and os.path.exists(report_path):
+                    os.remove(report_path)
+            except Exception as e:
+                print(f"Failed to remove files for item {item['id']}: {e}")
+    
+    if not background:
+        remove()
+        return None
+    import threading
+    thread = threading.Thread(target=remove, name="remove-item-files", daemon=True)
+    thread.start()
+    return thread
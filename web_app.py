@@ -1,58 +1,274 @@
 """
 FlipTrack Web Dashboard
-Run with: python web_app.py
+Run with: python web_app.py (development server)
+      or: python serve.py (several workers and threads, for shared use)
 Access at: http://localhost:5000
+
+create_app() builds an app for one database file; WSGI servers can load
+it as "web_app:create_app()".
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, flash
+from flask import (Blueprint, Flask, Response, current_app, render_template, request, jsonify,
+                   redirect, url_for, send_file, flash)
+from werkzeug.local import LocalProxy
 from werkzeug.utils import secure_filename
-from database import Database
+from analytics import get_analytics
+from database import (Database, ConcurrentUpdateError, ITEM_LIST_COLUMNS, KEYSET_SORT_COLUMNS,
+                      parse_tags)
+from export_utils import gzip_chunks, iter_csv, iter_ndjson
 from report_generator import ReportGenerator
-from utils import optimize_image
+from utils import remove_item_files
+from jobs import JobQueue
+import query_profiler
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from functools import wraps
 from pathlib import Path
-import shutil
+from typing import Dict
+
+DEFAULT_CONFIG = {
+    # Every worker must share the key so flash messages survive a hop between them
+    'SECRET_KEY': os.environ.get('FLIPTRACK_SECRET_KEY', 'fliptrack-secret-key-change-in-production'),
+    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+    'UPLOAD_FOLDER': 'data/images',
+    'RESPONSE_CACHE_SIZE': 256,  # rendered pages kept
+    'RESPONSE_CACHE_TTL': 300,  # seconds
+    'JOB_WORKERS': 2,  # background job threads per process
+}
+
+bp = Blueprint('dashboard', __name__)
+
+
+class ResponseCache:
+    """LRU cache of rendered pages with a TTL and hit/miss counters
+    
+    Keys include Database.data_version(), so a write from any process
+    makes older entries unreachable; the write routes also clear the
+    cache outright so memory is freed straight away.
+    """
+    
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def set(self, key, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+            }
+
+
+class AppServices:
+    """Database handle, page cache and job queue behind one app
+    
+    Built lazily by the first request in each serving process, so every
+    server worker gets its own connections, cache and job threads; the job
+    table's atomic claim keeps workers from running the same job twice.
+    """
+    
+    def __init__(self, db_path: str, config: Dict):
+        self.db_path = db_path
+        self.config = config
+        self._lock = threading.Lock()
+        self._db = None
+        self._response_cache = None
+        self._job_queue = None
+    
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = Database(self.db_path)
+        return self._db
+    
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            with self._lock:
+                if self._response_cache is None:
+                    self._response_cache = ResponseCache(self.config['RESPONSE_CACHE_SIZE'],
+                                                         self.config['RESPONSE_CACHE_TTL'])
+        return self._response_cache
+    
+    @property
+    def job_queue(self) -> JobQueue:
+        if self._job_queue is None:
+            with self._lock:
+                if self._job_queue is None:
+                    # Image optimization and report rendering run here, outside requests
+                    job_queue = JobQueue(self.db_path, workers=self.config['JOB_WORKERS'])
+                    job_queue.resume()
+                    self._job_queue = job_queue
+        return self._job_queue
+    
+    def shutdown(self):
+        """Stop the job queue and close this process's connections"""
+        if self._job_queue is not None:
+            self._job_queue.shutdown()
+            self._job_queue = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'fliptrack-secret-key-change-in-production'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['UPLOAD_FOLDER'] = 'data/images'
 
-# Initialize database
-db = Database()
+def _services() -> AppServices:
+    return current_app.extensions['fliptrack']
+
+
+# Resolve to the current app's services, so views read like plain globals
+db: Database = LocalProxy(lambda: _services().db)
+job_queue: JobQueue = LocalProxy(lambda: _services().job_queue)
+response_cache: ResponseCache = LocalProxy(lambda: _services().response_cache)
+
+
+def create_app(db_path: str = "tracker.db", config: Dict = None) -> Flask:
+    """Build the web dashboard for one database file
+    
+    Nothing is opened here; the database, cache and job queue are set up
+    by the first request in each serving process.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.update(config or {})
+    app.extensions['fliptrack'] = AppServices(db_path, app.config)
+    app.register_blueprint(bp)
+    
+    # Ensure upload folder exists
+    Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    return app
 
-# Ensure upload folder exists
-Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
 
+@bp.before_app_request
+def _start_services():
+    # Jobs left by an earlier or crashed process resume in the serving process
+    _services().job_queue
 
-@app.route('/')
+
+def __getattr__(name):
+    # `web_app.app` is built on first use, for scripts that expect a module-level app
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def cached_response(view):
+    """Serve a GET page from response_cache, keyed by route, query args and data version"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), db.data_version())
+        body = response_cache.get(key)
+        if body is None:
+            body = view(*args, **kwargs)
+            if not isinstance(body, str):
+                # Errors and other responses are not cached
+                return body
+            response_cache.set(key, body)
+        return body
+    return wrapper
+
+
+@bp.route('/')
+@cached_response
 def index():
     """Dashboard home"""
-    stats = db.get_summary_stats()
-    items = db.get_all_items()
-    recent_items = items[:10]  # Last 10 items
+    # Rollup stats and the last 10 items, cached until the data changes
+    dashboard = db.get_dashboard_data(recent_limit=10)
     
     return render_template('dashboard.html', 
-                         stats=stats, 
-                         recent_items=recent_items)
+                         stats=dashboard['stats'], 
+                         recent_items=dashboard['recent_items'])
 
 
-@app.route('/items')
+@bp.route('/items')
+@cached_response
 def items_list():
-    """All items list"""
+    """All items list, one keyset page at a time"""
     search = request.args.get('search', '')
     status = request.args.get('status', 'All')
+    sort = request.args.get('sort') or None
+    order = request.args.get('order', 'desc')
+    cursor = request.args.get('cursor')
+    per_page = request.args.get('per_page', 50, type=int)
+    tag = request.args.get('tag', '')
+    tag_mode = request.args.get('tag_mode', 'any')
     
-    items = db.get_all_items(search_query=search, status_filter=status)
+    if sort not in KEYSET_SORT_COLUMNS:
+        sort = None  # Best match first for searches, newest first otherwise
+    if tag_mode not in ('any', 'all'):
+        tag_mode = 'any'
+    tags = parse_tags(tag)
+    
+    try:
+        page = db.get_items_page(search_query=search, status_filter=status,
+                                 sort_by=sort, descending=(order != 'asc'),
+                                 cursor=cursor, page_size=per_page,
+                                 tags=tags, tag_mode=tag_mode)
+        tag_counts = db.get_tag_counts()[:20]
+    except Exception as e:
+        return f"Error: {str(e)}", 400
+    
+    # Page links keep the current filters and sort
+    base_args = {k: v for k, v in request.args.items() if k != 'cursor'}
+    next_url = url_for('.items_list', **base_args, cursor=page['next_cursor']) if page['next_cursor'] else None
+    prev_url = url_for('.items_list', **base_args, cursor=page['prev_cursor']) if page['prev_cursor'] else None
     
     return render_template('items.html', 
-                         items=items, 
+                         items=page['items'], 
+                         total=page['total'],
                          search=search, 
-                         status=status)
+                         status=status,
+                         sort=sort,
+                         order=order,
+                         tags=tags,
+                         tag_mode=tag_mode,
+                         tag_counts=tag_counts,
+                         next_url=next_url,
+                         prev_url=prev_url)
 
 
-@app.route('/item/<int:item_id>')
+@bp.route('/item/<int:item_id>')
 def item_detail(item_id):
     """Item detail view"""
     item = db.get_item(item_id)
@@ -64,12 +280,16 @@ def item_detail(item_id):
     if item.get('provider_id'):
         provider = db.get_provider(item['provider_id'])
     
+    # Latest background job, so the page can show a pending report
+    report_job = db.get_latest_item_job(item_id, 'process_item')
+    
     return render_template('item_detail.html', 
                          item=item, 
-                         provider=provider)
+                         provider=provider,
+                         report_job=report_job)
 
 
-@app.route('/item/add', methods=['GET', 'POST'])
+@bp.route('/item/add', methods=['GET', 'POST'])
 def add_item():
     """Add new item"""
     if request.method == 'POST':
@@ -101,41 +321,32 @@ def add_item():
             
             # Add item first to get ID
             item_id = db.add_item(item_data)
+            response_cache.clear()
             
             # Handle image uploads
+            selected_images = []
             if 'images' in request.files:
                 files = request.files.getlist('images')
-                item_dir = Path(app.config['UPLOAD_FOLDER']) / f'item_{item_id}'
+                item_dir = Path(current_app.config['UPLOAD_FOLDER']) / f'item_{item_id}'
                 item_dir.mkdir(exist_ok=True)
                 
-                selected_images = []
                 for i, file in enumerate(files):
                     if file and file.filename:
                         filename = secure_filename(file.filename)
                         filepath = item_dir / f'image_{i+1}_{filename}'
                         file.save(filepath)
                         
-                        # Optimize image
-                        try:
-                            optimize_image(str(filepath), str(filepath))
-                        except:
-                            pass
-                        
                         # Store relative path
                         selected_images.append(str(filepath.relative_to('.')))
                 
                 # Update item with images
                 if selected_images:
-                    item_data['selected_images'] = selected_images
-                    db.update_item(item_id, item_data)
+                    db.patch_item(item_id, selected_images=selected_images)
             
-            # Generate report
-            item = db.get_item(item_id)
-            generator = ReportGenerator()
-            report_path = generator.generate_report(item)
-            db.update_report_path(item_id, report_path)
+            # Optimize the images and render the report after the redirect
+            job_queue.submit('process_item', item_id, images=selected_images)
             
-            return redirect(url_for('item_detail', item_id=item_id))
+            return redirect(url_for('.item_detail', item_id=item_id))
         
         except Exception as e:
             return f"Error: {str(e)}", 400
@@ -145,29 +356,24 @@ def add_item():
     return render_template('add_item.html', providers=providers)
 
 
-@app.route('/providers')
+@bp.route('/providers')
+@cached_response
 def providers_list():
     """Providers list"""
-    providers = db.get_all_providers()
-    
-    # Get stats for each provider
-    provider_stats = []
-    for provider in providers:
-        stats = db.get_provider_stats(provider['id'])
-        provider_stats.append({
-            'provider': provider,
-            'stats': stats
-        })
+    # One grouped query, ranked by actual profit
+    provider_stats = db.get_all_provider_stats()
     
     return render_template('providers.html', provider_stats=provider_stats)
 
 
-@app.route('/item/<int:item_id>/edit', methods=['GET', 'POST'])
+@bp.route('/item/<int:item_id>/edit', methods=['GET', 'POST'])
 def edit_item(item_id):
     """Edit item"""
     item = db.get_item(item_id)
     if not item:
         return "Item not found", 404
+    if item.get('archived_at'):
+        return "Archived items are read-only", 409
     
     if request.method == 'POST':
         try:
@@ -191,21 +397,17 @@ def edit_item(item_id):
                 'tags': request.form.get('tags', ''),
                 'notes': request.form.get('notes', ''),
                 'condition': request.form.get('condition', ''),
-                'storage_location': request.form.get('storage_location', ''),
-                'image_urls_cache': item.get('image_urls_cache', []),
-                'selected_images': item.get('selected_images', [])
+                'storage_location': request.form.get('storage_location', '')
             }
             
             # Update item
             db.update_item(item_id, item_data)
+            response_cache.clear()
             
-            # Regenerate report
-            item = db.get_item(item_id)
-            generator = ReportGenerator()
-            report_path = generator.generate_report(item)
-            db.update_report_path(item_id, report_path)
+            # Regenerate report in the background
+            job_queue.submit('process_item', item_id)
             
-            return redirect(url_for('item_detail', item_id=item_id))
+            return redirect(url_for('.item_detail', item_id=item_id))
         
         except Exception as e:
             return f"Error: {str(e)}", 400
@@ -215,88 +417,222 @@ def edit_item(item_id):
     return render_template('edit_item.html', item=item, providers=providers)
 
 
-@app.route('/item/<int:item_id>/delete', methods=['POST'])
+@bp.route('/item/<int:item_id>/delete', methods=['POST'])
 def delete_item(item_id):
     """Delete item"""
     try:
-        item = db.get_item(item_id)
-        if not item:
+        deleted = db.delete_items([item_id])
+        if not deleted:
             return jsonify({'error': 'Item not found'}), 404
+        response_cache.clear()
         
-        # Delete from database
-        db.delete_item(item_id)
-        
-        # Delete images directory
-        item_dir = Path(app.config['UPLOAD_FOLDER']) / f'item_{item_id}'
-        if item_dir.exists():
-            shutil.rmtree(item_dir)
-        
-        # Delete report
-        if item.get('report_path') and os.path.exists(item['report_path']):
-            os.remove(item['report_path'])
-        
+        # Images and report are removed in the background
+        remove_item_files(deleted, current_app.config['UPLOAD_FOLDER'])
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/analytics')
+def _request_item_ids():
+    """Item ids from a JSON 'ids' list or repeated 'ids' form fields"""
+    data = request.get_json(silent=True)
+    ids = data.get('ids') if data else request.form.getlist('ids')
+    if not ids:
+        raise ValueError('No item ids given')
+    return [int(item_id) for item_id in ids]
+
+
+@bp.route('/items/delete', methods=['POST'])
+def delete_items():
+    """Delete several items in one transaction"""
+    try:
+        ids = _request_item_ids()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        deleted = db.delete_items(ids)
+        response_cache.clear()
+        remove_item_files(deleted, current_app.config['UPLOAD_FOLDER'])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'success': True, 'deleted': [item['id'] for item in deleted]})
+
+
+@bp.route('/items/status', methods=['POST'])
+def update_items_status():
+    """Change the status (and optionally sale price) of several items at once"""
+    data = request.get_json(silent=True) or request.form
+    try:
+        ids = _request_item_ids()
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    status = data.get('status')
+    if status not in ('Draft', 'Listed', 'Sold'):
+        return jsonify({'error': 'Invalid status'}), 400
+    
+    fields = {}
+    if data.get('final_sold_price') not in (None, ''):
+        try:
+            fields['final_sold_price'] = float(data.get('final_sold_price'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid sold price'}), 400
+    
+    try:
+        updated = db.bulk_update_status(ids, status, **fields)
+        response_cache.clear()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'success': True, 'updated': updated})
+
+
+@bp.route('/item/<int:item_id>/status', methods=['POST'])
+def update_item_status(item_id):
+    """Change an item's status (and optionally its sale price) in one update"""
+    data = request.get_json(silent=True) or request.form
+    status = data.get('status')
+    if status not in ('Draft', 'Listed', 'Sold'):
+        return jsonify({'error': 'Invalid status'}), 400
+    
+    fields = {'status': status}
+    if data.get('final_sold_price') not in (None, ''):
+        try:
+            fields['final_sold_price'] = float(data.get('final_sold_price'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid sold price'}), 400
+    
+    expected_version = data.get('version')
+    try:
+        updated = db.patch_item(item_id,
+                                expected_version=int(expected_version) if expected_version not in (None, '') else None,
+                                **fields)
+    except ConcurrentUpdateError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    if not updated:
+        return jsonify({'error': 'Item not found'}), 404
+    response_cache.clear()
+    return jsonify({'success': True})
+
+
+@bp.route('/archive', methods=['POST'])
+def archive_items():
+    """Move items sold before a cutoff date into the archive"""
+    data = request.get_json(silent=True) or request.form
+    before = data.get('before')
+    try:
+        datetime.strptime(before or '', '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'error': 'before must be a YYYY-MM-DD date'}), 400
+    
+    try:
+        archived = db.archive_sold_before(before)
+        response_cache.clear()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'success': True, 'archived': archived})
+
+
+@bp.route('/analytics')
+@cached_response
 def analytics():
-    """Analytics dashboard"""
-    stats = db.get_summary_stats()
-    items = db.get_all_items()
-    
-    # Sales channels
-    channels = {}
-    for item in items:
-        if item['status'] == 'Sold' and item.get('sales_channel'):
-            channel = item['sales_channel']
-            if channel not in channels:
-                channels[channel] = {'count': 0, 'revenue': 0, 'profit': 0}
-            
-            channels[channel]['count'] += 1
-            channels[channel]['revenue'] += item['final_sold_price']
-            
-            total_expenses = (
-                item['purchase_price'] + item['shipping_cost'] +
-                item.get('listing_fee', 0) + item.get('processing_fee', 0) +
-                item.get('storage_cost', 0) + item.get('other_expenses', 0)
-            )
-            channels[channel]['profit'] += item['final_sold_price'] - total_expenses
+    """Analytics dashboard (lifetime figures, archived sales included)"""
+    stats = db.get_summary_stats(include_archive=True)
+    report = get_analytics(db, include_archive=True)
+    
+    # Sales channels, most profitable first
+    channels = {
+        group['key']: {'count': group['sold'], 'revenue': group['revenue'], 'profit': group['profit']}
+        for group in report.channels
+    }
     
     return render_template('analytics.html', 
                          stats=stats, 
-                         channels=channels)
+                         channels=channels,
+                         summary=report.summary,
+                         categories=report.categories,
+                         quarters=report.quarterly_profit(),
+                         margins=report.margin_distribution())
 
 
-@app.route('/export/csv')
-def export_csv():
-    """Export items to CSV"""
-    try:
-        from export_utils import export_to_csv
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = f"fliptrack_export_{timestamp}.csv"
-        path = export_to_csv(output_path)
-        return send_file(path, as_attachment=True)
-    except Exception as e:
-        return f"Export failed: {str(e)}", 500
+@bp.route('/debug/queries')
+def debug_queries():
+    """Query profiler statistics (set FLIPTRACK_PROFILE_QUERIES=1 to collect them)"""
+    if not query_profiler.is_enabled():
+        return jsonify({'error': 'Query profiling is disabled'}), 404
+    profiler = query_profiler.PROFILER
+    return jsonify({
+        'slow_ms': profiler.slow_ms,
+        'methods': profiler.method_stats(),
+        'statements': profiler.statement_stats(),
+        'slow_queries': list(profiler.slow_queries),
+    })
+
+
+@bp.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    """Status of a background job"""
+    job = db.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+    """Response cache size and hit/miss counters"""
+    return jsonify(response_cache.stats())
+
+
+# Streamed export formats: (row generator, mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson'),
+}
+
+
+@bp.route('/export/csv', defaults={'fmt': 'csv'})
+@bp.route('/export/<fmt>')
+def export_items(fmt):
+    """Stream items as CSV or NDJSON straight from a database cursor
+    
+    Takes the same filters as /items (search, status, tag, tag_mode),
+    plus archive=1 to include archived items and gzip=1 to compress.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return f"Unknown export format: {fmt}", 404
+    rows, mimetype, extension = EXPORT_FORMATS[fmt]
+    
+    tag_mode = request.args.get('tag_mode', 'any')
+    items = db.iter_items(search_query=request.args.get('search', ''),
+                          status_filter=request.args.get('status', 'All'),
+                          tags=parse_tags(request.args.get('tag', '')),
+                          tag_mode=tag_mode if tag_mode in ('any', 'all') else 'any',
+                          include_images=True,
+                          include_archive=request.args.get('archive') == '1')
+    body = rows(items)
+    
+    filename = f"fliptrack_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    if request.args.get('gzip') == '1':
+        body = gzip_chunks(body)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    return Response(body, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 
-@app.route('/export/tax-report')
+@bp.route('/export/tax-report')
+@cached_response
 def tax_report():
     """Generate tax report"""
     try:
-        items = db.get_all_items(status_filter='Sold')
-        stats = db.get_summary_stats()
+        items = db.get_all_items(status_filter='Sold', include_archive=True)
         
         # Calculate tax info
         total_revenue = sum(item['final_sold_price'] for item in items if item.get('final_sold_price'))
-        total_expenses = sum(
-            item['purchase_price'] + item['shipping_cost'] +
-            item.get('listing_fee', 0) + item.get('processing_fee', 0) +
-            item.get('storage_cost', 0) + item.get('other_expenses', 0)
-            for item in items
-        )
+        total_expenses = sum(item['total_expenses'] for item in items)
         
         return render_template('tax_report.html', 
                              items=items, 
@@ -307,29 +643,28 @@ def tax_report():
         return f"Error: {str(e)}", 500
 
 
-@app.route('/reports/master')
+@bp.route('/reports/master')
 def master_report():
     """Generate and view master index"""
     try:
-        items = db.get_all_items()
         generator = ReportGenerator()
         
         # Generate missing reports
-        for item in items:
+        for item in db.iter_items(include_images=True):
             if not item.get('report_path') or not os.path.exists(item.get('report_path', '')):
                 report_path = generator.generate_report(item)
                 db.update_report_path(item['id'], report_path)
         
         # Generate master index with web_mode=True for Flask routes
-        items = db.get_all_items()
-        index_path = generator.generate_master_index(items, web_mode=True)
+        index_path = generator.generate_master_index(db.iter_items(columns=ITEM_LIST_COLUMNS),
+                                                     web_mode=True)
         
         return send_file(index_path)
     except Exception as e:
         return f"Error: {str(e)}", 500
 
 
-@app.route('/reports/item/<int:item_id>')
+@bp.route('/reports/item/<int:item_id>')
 def item_report(item_id):
     """Serve individual item report"""
     try:
@@ -358,4 +693,4 @@ if __name__ == '__main__':
     print(f"Access at: http://localhost:5000")
     print(f"Press Ctrl+C to stop")
     print("=" * 60)
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    create_app().run(debug=True, host='0.0.0.0', port=5000)